@@ -0,0 +1,227 @@
+"""Seekable archive of recorded frames.
+
+Every frame is stored as a fixed size record (see frame_dtype), so frame n of
+the archive sits at HEADER.size + n * itemsize and the whole file can be
+memory mapped as a NumPy structured array: jumping to a step is O(1) and a
+range of steps is a slice, e.g. archive.frames["mushrooms"][100:200].
+
+Set Game.archive to an ArchiveWriter to record a game as it is played. The
+writer hands frames to the operating system every flush_every frames and on
+close(), so a crash of the process loses at most the frames written since
+the last flush; they are not synced to the disk.
+"""
+
+import logging
+import struct
+
+import numpy as np
+
+from consts import CENTIPEDE_LENGTH, COOL_DOWN, Direction
+
+logger = logging.getLogger("Archive")
+logger.setLevel(logging.DEBUG)
+
+MAGIC = b"CARC"
+VERSION = 1
+# magic, version, width, height, segments, centipedes, blasts
+HEADER = struct.Struct("<4sB5H")
+
+BLASTER_ALIVE, HAS_SPIDER, HAS_FLEE = 1, 2, 4
+FLUSH_EVERY = 10  # frames written between flushes of the archive file
+
+
+def frame_dtype(size, segments=CENTIPEDE_LENGTH, centipedes=None, blasts=None):
+    """Record layout of a frame for a map of the given size.
+
+    Centipede k owns the cen_len[k] segments following those of centipede
+    k - 1, listed tail first like Centipede.body.
+    """
+    width, height = size
+    centipedes = centipedes or segments + 1
+    blasts = blasts or height // COOL_DOWN + 2
+    return np.dtype(
+        [
+            ("step", "<u4"),
+            ("score", "<i8"),
+            ("flags", "u1"),
+            ("bug_blaster", "<i2", (2,)),
+            ("spider", "<i2", (2,)),
+            ("flee", "<i2", (2,)),
+            ("mushrooms", "u1", (width, height)),
+            ("n_centipedes", "u1"),
+            ("cen_len", "u1", (centipedes,)),
+            ("cen_dir", "u1", (centipedes,)),
+            ("segments", "<i2", (segments, 2)),
+            ("n_blasts", "u1"),
+            ("blasts", "<i2", (blasts, 2)),
+        ]
+    )
+
+
+class ArchiveWriter:
+    """Appends the frames of a game to an archive file."""
+
+    def __init__(self, path, size, segments=CENTIPEDE_LENGTH, flush_every=FLUSH_EVERY):
+        self.dtype = frame_dtype(size, segments)
+        self.flush_every = flush_every
+        self._unflushed = 0  # frames written since the last flush
+        self._frame = np.zeros((), dtype=self.dtype)
+        self._file = open(path, "wb")
+        self._file.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                *size,
+                segments,
+                self.dtype["cen_len"].shape[0],
+                self.dtype["blasts"].shape[0],
+            )
+        )
+
+    def write(self, state):
+        """Append the frame holding state, as returned by Game.step()."""
+        frame = self._frame
+        frame["step"] = state["step"]
+        frame["score"] = state["score"]
+
+        flags = BLASTER_ALIVE if state["bug_blaster"]["alive"] else 0
+        frame["bug_blaster"] = state["bug_blaster"]["pos"]
+        for key, flag in (("spider", HAS_SPIDER), ("flee", HAS_FLEE)):
+            if key in state:
+                flags |= flag
+                frame[key] = state[key]["pos"]
+            else:
+                frame[key] = 0
+        frame["flags"] = flags
+
+        mushrooms = frame["mushrooms"]
+        mushrooms[...] = 0
+        for mushroom in state["mushrooms"]:
+            mushrooms[tuple(mushroom["pos"])] = mushroom["health"]
+
+        segments = frame["segments"]
+        cen_len, cen_dir = frame["cen_len"], frame["cen_dir"]
+        segments[...] = 0
+        cen_len[...] = 0
+        cen_dir[...] = 0
+        used = 0
+        centipedes = state["centipedes"][: len(cen_len)]
+        for k, centipede in enumerate(centipedes):
+            body = centipede["body"][: len(segments) - used]
+            if len(body) < len(centipede["body"]):
+                logger.warning("Frame %s: centipedes truncated", state["step"])
+            if body:
+                segments[used : used + len(body)] = body
+            cen_len[k] = len(body)
+            cen_dir[k] = centipede["direction"]
+            used += len(body)
+        frame["n_centipedes"] = len(centipedes)
+
+        blasts = state["blasts"][: len(frame["blasts"])]
+        frame["blasts"] = 0
+        if blasts:
+            frame["blasts"][: len(blasts)] = blasts
+        frame["n_blasts"] = len(blasts)
+
+        self._file.write(frame.tobytes())
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Hand the frames written so far to the operating system."""
+        self._file.flush()
+        self._unflushed = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class Archive:
+    """Memory mapped, read only view of an archive file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as infile:
+            header = infile.read(HEADER.size)
+        magic, version, width, height, segments, centipedes, blasts = HEADER.unpack(
+            header
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} frame archive")
+
+        self.size = (width, height)
+        self.dtype = frame_dtype(self.size, segments, centipedes, blasts)
+        try:
+            self.frames = np.memmap(
+                path, dtype=self.dtype, mode="r", offset=HEADER.size
+            )
+        except ValueError:  # no frame recorded
+            self.frames = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    @property
+    def first_step(self):
+        return int(self.frames[0]["step"]) if len(self.frames) else None
+
+    def frame(self, step):
+        """Record of the given step."""
+        if not len(self.frames) or not 0 <= step - self.first_step < len(self):
+            raise IndexError(f"Step {step} not in archive")
+        return self.frames[step - self.first_step]
+
+    def steps(self, first, last):
+        """Records of steps first to last, both included."""
+        for step in (first, last):
+            if not len(self.frames) or not 0 <= step - self.first_step < len(self):
+                raise IndexError(f"Step {step} not in archive")
+        return self.frames[first - self.first_step : last - self.first_step + 1]
+
+    def state(self, step):
+        """Rebuild the state of step, in the structure Game.step() returns.
+
+        Centipede names are not archived, they are numbered instead.
+        """
+        frame = self.frame(step)
+        flags = int(frame["flags"])
+
+        centipedes, used = [], 0
+        for k in range(int(frame["n_centipedes"])):
+            length = int(frame["cen_len"][k])
+            body = frame["segments"][used : used + length].tolist()
+            centipedes.append(
+                {
+                    "name": f"centipede{k}",
+                    "body": [tuple(pos) for pos in body],
+                    "direction": Direction(int(frame["cen_dir"][k])),
+                }
+            )
+            used += length
+
+        xs, ys = np.nonzero(frame["mushrooms"])
+        state = {
+            "centipedes": centipedes,
+            "bug_blaster": {
+                "pos": tuple(frame["bug_blaster"].tolist()),
+                "alive": bool(flags & BLASTER_ALIVE),
+            },
+            "mushrooms": [
+                {"pos": (x, y), "health": int(frame["mushrooms"][x, y])}
+                for x, y in zip(xs.tolist(), ys.tolist())
+            ],
+            "blasts": [
+                tuple(blast) for blast in frame["blasts"][: frame["n_blasts"]].tolist()
+            ],
+            "step": int(frame["step"]),
+            "score": int(frame["score"]),
+        }
+        if flags & HAS_SPIDER:
+            state["spider"] = {"pos": tuple(frame["spider"].tolist()), "alive": True}
+        if flags & HAS_FLEE:
+            state["flee"] = {"pos": tuple(frame["flee"].tolist()), "alive": True}
+        return state
@@ -0,0 +1,623 @@
+"""Vectorized engine stepping many independent games in lockstep."""
+import logging
+import math
+
+import numpy as np
+
+from consts import (
+    CENTIPEDE_LENGTH,
+    COOL_DOWN,
+    KILL_CENTIPEDE_BODY_POINTS,
+    KILL_FLEE_POINTS,
+    KILL_MUSHROOM_POINTS,
+    KILL_SPIDER_POINTS,
+    MUSHROOM_SPAWN_RATE,
+    TIMEOUT,
+    Direction,
+    Tiles,
+)
+from game import MAP_SIZE
+from mapa import BOTTOM_ROWS
+
+logger = logging.getLogger("BatchGame")
+logger.setLevel(logging.DEBUG)
+
+# Keys accepted by Game.keypress, indexed by action code
+ACTIONS = ("", "w", "a", "s", "d", "A")
+NOOP, UP, LEFT, DOWN, RIGHT, FIRE = range(len(ACTIONS))
+
+MUSHROOM_HEALTH = 4
+
+# Direction -> (dx, dy), indexed by Direction value
+DX = np.array([0, 1, 0, -1], dtype=np.int16)
+DY = np.array([-1, 0, 1, 0], dtype=np.int16)
+
+# action code -> Direction, -1 when the action does not move the blaster
+ACTION_DIRECTION = np.array(
+    [-1, Direction.NORTH, Direction.WEST, Direction.SOUTH, Direction.EAST, -1],
+    dtype=np.int8,
+)
+
+FLEE_NONE, FLEE_ALIVE, FLEE_DEAD = range(3)
+
+
+class BatchGame:
+    """N independent games held as NumPy arrays and advanced together.
+
+    Each game follows the rules of Game.step(): same tick phases, same
+    scoring and same game over conditions. Centipede segments live in
+    CENTIPEDE_LENGTH slots per game, every centipede owning a contiguous
+    range of slots (lo..hi) with its head at hi, or at lo when reversed.
+    Splitting a centipede therefore never moves any segment around.
+    """
+
+    def __init__(
+        self,
+        n,
+        timeout=TIMEOUT,
+        size=MAP_SIZE,
+        mushroom_percentage=0.1,
+        seed=None,
+    ):
+        assert size[0] >= CENTIPEDE_LENGTH, "Map too narrow for the centipede"
+        self.n = n
+        self.size = size
+        self._timeout = timeout
+        self._mushroom_percentage = mushroom_percentage
+        self._rng = np.random.default_rng(seed)
+
+        W, H = size
+        S = CENTIPEDE_LENGTH
+        C = S + 1  # every hit removes a segment and adds at most one centipede
+        B = H // COOL_DOWN + 2  # blasts alive at the same time
+
+        self._g = np.arange(n)
+        self._slots = np.arange(S)
+
+        self.steps = np.zeros(n, dtype=np.int32)
+        self.running = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.last_key = np.zeros(n, dtype=np.int8)
+
+        self.mushrooms = np.zeros((n, W, H), dtype=np.int8)
+        # cells Map.spawn_mushroom() no longer draws from, like its FOOD tiles
+        self.used = np.zeros((n, W, H), dtype=bool)
+        # spawns already drawn by the Map of a loaded game, played first
+        Q = math.ceil(W * H * 0.1)
+        self.queue_x = np.zeros((n, Q), dtype=np.int16)
+        self.queue_y = np.zeros((n, Q), dtype=np.int16)
+        self.queue_len = np.zeros(n, dtype=np.int16)
+        self.queue_head = np.zeros(n, dtype=np.int16)
+
+        self.seg_x = np.zeros((n, S), dtype=np.int16)
+        self.seg_y = np.zeros((n, S), dtype=np.int16)
+        self.seg_alive = np.zeros((n, S), dtype=bool)
+        self.seg_owner = np.full((n, S), -1, dtype=np.int16)
+
+        self.cen_count = np.zeros(n, dtype=np.int16)
+        self.cen_alive = np.zeros((n, C), dtype=bool)
+        self.cen_lo = np.zeros((n, C), dtype=np.int16)
+        self.cen_hi = np.zeros((n, C), dtype=np.int16)
+        self.cen_rev = np.zeros((n, C), dtype=bool)
+        self.cen_dir = np.zeros((n, C), dtype=np.int8)
+        self.cen_move_dir = np.ones((n, C), dtype=np.int8)
+        self.cen_waiting = np.zeros((n, C), dtype=bool)
+
+        self.blaster_x = np.zeros(n, dtype=np.int16)
+        self.blaster_y = np.zeros(n, dtype=np.int16)
+        self.blaster_alive = np.zeros(n, dtype=bool)
+        self.blaster_dir = np.zeros(n, dtype=np.int8)
+        self.cooldown = np.zeros(n, dtype=np.int16)
+
+        self.blast_x = np.zeros((n, B), dtype=np.int16)
+        self.blast_y = np.zeros((n, B), dtype=np.int16)
+        self.blast_alive = np.zeros((n, B), dtype=bool)
+
+        self.spider_x = np.zeros(n, dtype=np.int16)
+        self.spider_y = np.zeros(n, dtype=np.int16)
+        self.spider_alive = np.zeros(n, dtype=bool)
+        self.spider_origin_y = np.zeros(n, dtype=np.int16)
+        self.spider_vx = np.zeros(n, dtype=np.int16)
+        self.spider_t = np.zeros(n, dtype=np.float64)
+        self.spider_freq = np.zeros(n, dtype=np.float64)
+
+        self.flee_x = np.zeros(n, dtype=np.int16)
+        self.flee_y = np.zeros(n, dtype=np.int16)
+        self.flee_state = np.zeros(n, dtype=np.int8)
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    def reset(self, games=None):
+        """Start new games in the given slots (all of them by default)."""
+        idx = self._g if games is None else np.asarray(games)
+        if idx.dtype == bool:
+            idx = np.flatnonzero(idx)
+        k = len(idx)
+        if k == 0:
+            return
+        W, H = self.size
+        S = CENTIPEDE_LENGTH
+
+        self.steps[idx] = 0
+        self.running[idx] = True
+        self.score[idx] = 0
+        self.last_key[idx] = NOOP
+
+        # same distribution as Map(): a share of random cells, bottom rows clear
+        count = math.ceil(W * H * self._mushroom_percentage)
+        cells = np.argpartition(self._rng.random((k, W * H)), count - 1, axis=1)
+        grid = np.zeros((k, W * H), dtype=np.int8)
+        np.put_along_axis(grid, cells[:, :count], MUSHROOM_HEALTH, axis=1)
+        grid = grid.reshape(k, W, H)
+        grid[:, :, H - BOTTOM_ROWS :] = 0
+        self.mushrooms[idx] = grid
+        self.used[idx] = grid > 0
+        self.queue_len[idx] = 0
+        self.queue_head[idx] = 0
+
+        # Map.spawn_centipede(): a single centipede along the top row
+        self.seg_x[idx] = self._slots
+        self.seg_y[idx] = 0
+        self.seg_alive[idx] = True
+        self.seg_owner[idx] = 0
+        self.cen_count[idx] = 1
+        self.cen_alive[idx] = False
+        self.cen_alive[idx, 0] = True
+        self.cen_lo[idx, 0] = 0
+        self.cen_hi[idx, 0] = S - 1
+        self.cen_rev[idx] = False
+        self.cen_dir[idx] = Direction.EAST
+        self.cen_move_dir[idx] = 1
+        self.cen_waiting[idx] = False
+
+        self.blaster_x[idx] = W // 2
+        self.blaster_y[idx] = H - 1
+        self.blaster_alive[idx] = True
+        self.blaster_dir[idx] = Direction.EAST
+        self.cooldown[idx] = 0
+
+        self.blast_alive[idx] = False
+
+        self.spider_x[idx] = 0
+        self.spider_y[idx] = self._rng.integers(0, H // 2 + 1, k)
+        self.spider_origin_y[idx] = self.spider_y[idx]
+        self.spider_vx[idx] = 1
+        self.spider_t[idx] = 0.0
+        self.spider_freq[idx] = self._rng.uniform(0.1, 1.0, k)
+        self.spider_alive[idx] = True
+
+        self.flee_state[idx] = FLEE_NONE
+
+    def load(self, i, game):
+        """Copy the state of a running Game into slot i."""
+        W, H = self.size
+        assert tuple(game.map.size) == tuple(self.size), "Map size mismatch"
+
+        self.steps[i] = game._step
+        self.running[i] = game.running
+        self.score[i] = game.score
+        self.last_key[i] = ACTIONS.index(game._last_key)
+
+        self.mushrooms[i] = 0
+        for mushroom in game._mushrooms:
+            if mushroom.exists():
+                self.mushrooms[(i, *mushroom.pos)] = mushroom.health
+        self.used[i] = game.map.grid != Tiles.PASSAGE
+        queue = list(game.map._queue_mushrooms)[: self.queue_x.shape[1]]
+        self.queue_len[i], self.queue_head[i] = len(queue), 0
+        if queue:
+            self.queue_x[i, : len(queue)], self.queue_y[i, : len(queue)] = zip(*queue)
+
+        self.seg_alive[i] = False
+        self.seg_owner[i] = -1
+        self.cen_alive[i] = False
+        slot = 0
+        centipedes = [c for c in game.centipedes if c.alive]
+        for k, centipede in enumerate(centipedes):
+            body = centipede.body
+            for x, y in body:
+                self.seg_x[i, slot], self.seg_y[i, slot] = x, y
+                self.seg_alive[i, slot] = True
+                self.seg_owner[i, slot] = k
+                slot += 1
+            self.cen_alive[i, k] = True
+            self.cen_lo[i, k] = slot - len(body)
+            self.cen_hi[i, k] = slot - 1
+            self.cen_rev[i, k] = False
+            self.cen_dir[i, k] = centipede.direction
+            self.cen_move_dir[i, k] = centipede.move_dir
+            self.cen_waiting[i, k] = centipede.waiting_to_move_vertically
+        self.cen_count[i] = len(centipedes)
+
+        blaster = game.bug_blaster
+        self.blaster_x[i], self.blaster_y[i] = blaster.pos
+        self.blaster_alive[i] = blaster.exists()
+        self.blaster_dir[i] = blaster.direction
+        self.cooldown[i] = game._cooldown
+
+        self.blast_alive[i] = False
+        for b, (x, y) in enumerate(game._blasts):
+            self.blast_x[i, b], self.blast_y[i, b] = x, y
+            self.blast_alive[i, b] = True
+
+        spider = game._spider
+        self.spider_x[i], self.spider_y[i] = spider.pos
+        self.spider_alive[i] = spider.exists()
+        self.spider_origin_y[i] = spider._origin_y
+        self.spider_vx[i] = spider._vx
+        self.spider_t[i] = spider._t
+        self.spider_freq[i] = spider._frequency
+
+        flee = game._flee
+        if flee is None:
+            self.flee_state[i] = FLEE_NONE
+        else:
+            self.flee_x[i], self.flee_y[i] = flee.pos
+            self.flee_state[i] = FLEE_ALIVE if flee.exists() else FLEE_DEAD
+
+    def step(self, actions=None):
+        """Advance every running game one tick.
+
+        actions holds one action code per game (see ACTIONS) and behaves like
+        Game.keypress(); None keeps the keys from the previous tick.
+        Returns the mask of games that advanced.
+        """
+        if actions is not None:
+            actions = np.asarray(actions, dtype=np.int8)
+            self.last_key[self.running] = np.broadcast_to(actions, (self.n,))[
+                self.running
+            ]
+
+        act = self.running.copy()
+        if not act.any():
+            return act
+
+        self.steps[act] += 1
+        self.running[act & (self.steps == self._timeout)] = False
+
+        self._move_centipedes(act)
+        self._update_spider(act)
+        self._update_flee(act)
+        self._collision(act & self.running)
+        self._update_bug_blaster(act & self.blaster_alive)
+        self._update_blasts(act)
+        self._collision(act & self.running)
+        self._spawn_mushrooms(act)
+
+        over = act & (~self.blaster_alive | ~self.cen_alive.any(axis=1))
+        self.running[over] = False
+
+        return act
+
+    def _move_centipedes(self, act):
+        W, H = self.size
+        g = self._g
+        for k in range(int(self.cen_count[act].max(initial=0))):
+            m = act & self.cen_alive[:, k]
+            if not m.any():
+                continue
+
+            lo, hi = self.cen_lo[:, k], self.cen_hi[:, k]
+            rev = self.cen_rev[:, k]
+            # dead centipedes may hold an empty range, keep their reads in bounds
+            head = np.clip(np.where(rev, lo, hi), 0, CENTIPEDE_LENGTH - 1)
+            hx, hy = self.seg_x[g, head], self.seg_y[g, head]
+            d = self.cen_dir[:, k]
+
+            # Map.calc_pos(): stay put when leaving the map
+            nx, ny = hx + DX[d], hy + DY[d]
+            inside = (nx >= 0) & (nx < W) & (ny >= 0) & (ny < H)
+            nx, ny = np.where(inside, nx, hx), np.where(inside, ny, hy)
+
+            # bumping into another centipede reverses this one
+            others = self.seg_alive & (self.seg_owner != k)
+            bump = m & (
+                others & (self.seg_x == nx[:, None]) & (self.seg_y == ny[:, None])
+            ).any(axis=1)
+            self.cen_rev[bump, k] ^= True
+            self.cen_dir[bump, k] = (d[bump] + 2) % 4
+
+            m &= ~bump
+            if not m.any():
+                continue
+
+            blocked = self.mushrooms[g, nx, ny] > 0
+            nx, ny = np.where(blocked, hx, nx), np.where(blocked, hy, ny)
+            wall = (nx == hx) & (ny == hy)
+
+            move_dir = self.cen_move_dir[:, k].copy()
+            move_dir[wall & (hy == 0)] = 1
+            move_dir[wall & (hy >= H - 1)] = -1
+            vy = hy + move_dir
+            vfree = (vy >= 0) & (vy < H)
+            vfree &= self.mushrooms[g, hx, np.clip(vy, 0, H - 1)] == 0
+
+            waiting = self.cen_waiting[:, k] | (wall & ~vfree)
+            ny = np.where(wall & vfree, vy, ny)
+            d = np.where(
+                wall,
+                np.where(d == Direction.WEST, Direction.EAST, Direction.WEST),
+                d,
+            ).astype(np.int8)
+
+            # vertical debt left from a previous tick
+            debt = waiting & vfree
+            nx, ny = np.where(debt, hx, nx), np.where(debt, vy, ny)
+            waiting &= ~debt
+
+            self.cen_move_dir[m, k] = move_dir[m]
+            self.cen_waiting[m, k] = waiting[m]
+            self.cen_dir[m, k] = d[m]
+
+            # every segment takes the place of its neighbour towards the head
+            own = m[:, None] & (self.seg_owner == k)
+            fwd = own & ~rev[:, None] & (self._slots < hi[:, None])
+            bwd = own & rev[:, None] & (self._slots > lo[:, None])
+            for seg in (self.seg_x, self.seg_y):
+                up = np.concatenate([seg[:, 1:], seg[:, -1:]], axis=1)
+                down = np.concatenate([seg[:, :1], seg[:, :-1]], axis=1)
+                seg[...] = np.where(fwd, up, np.where(bwd, down, seg))
+            self.seg_x[g[m], head[m]] = nx[m]
+            self.seg_y[g[m], head[m]] = ny[m]
+
+    def _update_spider(self, act):
+        W, H = self.size
+        m = act & self.spider_alive
+        if not m.any():
+            return
+
+        self.spider_t[m] += self.spider_freq[m]
+
+        x = self.spider_x + self.spider_vx
+        bounce = (x < 0) | (x > W - 1)
+        self.spider_vx[m & bounce] *= -1
+        x = np.clip(x, 0, W - 1)
+
+        offset = np.floor_divide(np.sin(self.spider_t) * H, 2)
+        y = np.clip(np.round(self.spider_origin_y + offset), 0, H - 1)
+
+        self.spider_x[m] = x[m]
+        self.spider_y[m] = y[m]
+
+        sx, sy = self.spider_x, self.spider_y
+        self.blaster_alive[m & (sx == self.blaster_x) & (sy == self.blaster_y)] = False
+        eaten = np.flatnonzero(m)
+        self.mushrooms[eaten, sx[eaten], sy[eaten]] = 0
+
+    def _update_flee(self, act):
+        H = self.size[1]
+        self.flee_state[act & (self.flee_state == FLEE_DEAD)] = FLEE_NONE
+
+        m = act & (self.flee_state == FLEE_ALIVE)
+        if not m.any():
+            return
+
+        left = m & (self.flee_y + 1 >= H)
+        self.flee_state[left] = FLEE_DEAD
+        m &= ~left
+        self.flee_y[m] += 1
+
+        hit = m & (self.flee_x == self.blaster_x) & (self.flee_y == self.blaster_y)
+        self.blaster_alive[hit] = False
+
+    def _collision(self, m):
+        if not m.any():
+            return
+        S = CENTIPEDE_LENGTH
+        C = self.cen_alive.shape[1]
+
+        for b in range(self.blast_alive.shape[1]):
+            bm = m & self.blast_alive[:, b]
+            if not bm.any():
+                continue
+            bx, by = self.blast_x[:, b], self.blast_y[:, b]
+            hits = (
+                bm[:, None]
+                & self.seg_alive
+                & (self.seg_x == bx[:, None])
+                & (self.seg_y == by[:, None])
+            )
+            gi = np.flatnonzero(hits.any(axis=1))
+            if len(gi) == 0:
+                continue
+            hits = hits[gi]
+
+            # first centipede holding the blast, hit at its first body segment
+            owner = np.where(hits, self.seg_owner[gi], C)
+            k = owner.min(axis=1)
+            hits &= owner == k[:, None]
+            rev = self.cen_rev[gi, k]
+            first = np.argmax(hits, axis=1)
+            last = S - 1 - np.argmax(hits[:, ::-1], axis=1)
+            h = np.where(rev, last, first)
+
+            lo, hi = self.cen_lo[gi, k], self.cen_hi[gi, k]
+            self.seg_alive[gi, h] = False
+            self.seg_owner[gi, h] = -1
+
+            # the tail keeps the centipede, the head side becomes a new one
+            tail_lo, tail_hi = np.where(rev, h + 1, lo), np.where(rev, hi, h - 1)
+            head_lo, head_hi = np.where(rev, lo, h + 1), np.where(rev, h - 1, hi)
+            self.cen_lo[gi, k], self.cen_hi[gi, k] = tail_lo, tail_hi
+            self.cen_alive[gi, k] = tail_lo <= tail_hi
+
+            child = head_lo <= head_hi
+            cg, c = gi[child], self.cen_count[gi[child]]
+            self.cen_alive[cg, c] = True
+            self.cen_lo[cg, c], self.cen_hi[cg, c] = head_lo[child], head_hi[child]
+            self.cen_rev[cg, c] = rev[child]
+            self.cen_dir[cg, c] = self.cen_dir[cg, k[child]]
+            self.cen_move_dir[cg, c] = 1
+            self.cen_waiting[cg, c] = False
+            moved = (self._slots >= head_lo[child, None]) & (
+                self._slots <= head_hi[child, None]
+            )
+            self.seg_owner[cg] = np.where(moved, c[:, None], self.seg_owner[cg])
+            self.cen_count[cg] += 1
+
+            self.score[gi] += KILL_CENTIPEDE_BODY_POINTS - by[gi]
+            self.mushrooms[gi, bx[gi], by[gi]] = MUSHROOM_HEALTH
+            self.blast_alive[gi, b] = False
+
+        crushed = (
+            m
+            & self.blaster_alive
+            & (
+                self.seg_alive
+                & (self.seg_x == self.blaster_x[:, None])
+                & (self.seg_y == self.blaster_y[:, None])
+            ).any(axis=1)
+        )
+        self.blaster_alive[crushed] = False
+
+    def _update_bug_blaster(self, m):
+        if not m.any():
+            return
+        W, H = self.size
+        g = self._g
+        key = self.last_key
+
+        d = ACTION_DIRECTION[key]
+        # fire keeps moving the blaster the way it was going
+        d = np.where(key == FIRE, self.blaster_dir, d)
+        moving = m & (d >= 0)
+        d = np.where(moving, d, 0)
+
+        x = np.clip(self.blaster_x + DX[d], 0, W - 1)
+        y = np.clip(self.blaster_y + DY[d], 0, H - 1)
+        self.blaster_dir[moving] = d[moving]
+        moving &= self.mushrooms[g, x, y] == 0
+        self.blaster_x[moving] = x[moving]
+        self.blaster_y[moving] = y[moving]
+
+        shoot = m & (key == FIRE) & (self.cooldown == 0)
+        shoot &= ~self.blast_alive.all(axis=1)  # no free slot, never drop a blast
+        if shoot.any():
+            si = np.flatnonzero(shoot)
+            b = np.argmin(self.blast_alive[si], axis=1)
+            self.blast_x[si, b] = self.blaster_x[si]
+            self.blast_y[si, b] = self.blaster_y[si]
+            self.blast_alive[si, b] = True
+            self.last_key[si] = NOOP
+            self.cooldown[si] = COOL_DOWN
+
+        self.cooldown[m & (self.cooldown > 0)] -= 1
+
+    def _update_blasts(self, act):
+        H = self.size[1]
+        alive = act[:, None] & self.blast_alive
+        if not alive.any():
+            return
+        self.blast_y[alive] -= 1
+        self.blast_alive[alive & (self.blast_y < 0)] = False
+
+        for b in range(self.blast_alive.shape[1]):
+            bm = act & self.blast_alive[:, b]
+            if not bm.any():
+                continue
+            bx, by = self.blast_x[:, b], self.blast_y[:, b]
+            gi = np.flatnonzero(bm)
+
+            mush = np.zeros_like(bm)
+            mush[gi] = self.mushrooms[gi, bx[gi], by[gi]] > 0
+            mi = np.flatnonzero(mush)
+            self.mushrooms[mi, bx[mi], by[mi]] -= 1
+            destroyed = mi[self.mushrooms[mi, bx[mi], by[mi]] == 0]
+            self.score[destroyed] += KILL_MUSHROOM_POINTS
+
+            spider = bm & self.spider_alive
+            spider &= (bx == self.spider_x) & (by == self.spider_y)
+            self.spider_alive[spider] = False
+            self.score[spider] += KILL_SPIDER_POINTS
+
+            flee = bm & (self.flee_state == FLEE_ALIVE)
+            flee &= (bx == self.flee_x) & (by == self.flee_y)
+            self.flee_state[flee] = FLEE_DEAD
+            self.score[flee] += KILL_FLEE_POINTS
+
+            self.blast_alive[mush | spider | flee, b] = False
+
+    def _spawn_mushrooms(self, act):
+        W, H = self.size
+        m = act & (self.steps % MUSHROOM_SPAWN_RATE == 0)
+        m &= self.flee_state == FLEE_NONE
+        si = np.flatnonzero(m)
+        if not len(si):
+            return
+
+        # Map.spawn_mushroom(): the queued cells, then unused top rows cells
+        top = H - BOTTOM_ROWS + 1
+        x = np.zeros(len(si), dtype=np.int16)
+        y = np.zeros(len(si), dtype=np.int16)
+        found = np.ones(len(si), dtype=bool)
+        queued = self.queue_head[si] < self.queue_len[si]
+        q = si[queued]
+        x[queued] = self.queue_x[q, self.queue_head[q]]
+        y[queued] = self.queue_y[q, self.queue_head[q]]
+        self.queue_head[q] += 1
+        if (d := si[~queued]).size:
+            keys = self._rng.random((len(d), W, top))
+            keys[self.used[d, :, :top]] = -1
+            keys = keys.reshape(len(d), -1)
+            cell = keys.argmax(axis=1)
+            found[~queued] = keys[np.arange(len(d)), cell] >= 0
+            x[~queued], y[~queued] = np.divmod(cell, top)
+        si, x, y = si[found], x[found], y[found]
+        self.used[si, x, y] = True
+
+        spawn = (x != self.blaster_x[si]) | (y != self.blaster_y[si])
+        si, x, y = si[spawn], x[spawn], y[spawn]
+        self.mushrooms[si, x, y] = MUSHROOM_HEALTH
+        self.flee_x[si], self.flee_y[si] = x, y
+        self.flee_state[si] = FLEE_ALIVE
+
+    def state(self, i):
+        """State of game i, shaped like the one returned by Game.step()."""
+        centipedes = []
+        for k in np.flatnonzero(self.cen_alive[i]):
+            lo, hi = self.cen_lo[i, k], self.cen_hi[i, k]
+            body = list(
+                zip(self.seg_x[i, lo : hi + 1].tolist(), self.seg_y[i, lo : hi + 1].tolist())
+            )
+            if self.cen_rev[i, k]:
+                body.reverse()
+            centipedes.append(
+                {
+                    "name": "mother" if k == 0 else f"mother_{k}",
+                    "body": body,
+                    "direction": Direction(int(self.cen_dir[i, k])),
+                }
+            )
+
+        xs, ys = np.nonzero(self.mushrooms[i])
+        state = {
+            "centipedes": centipedes,
+            "bug_blaster": {
+                "pos": (int(self.blaster_x[i]), int(self.blaster_y[i])),
+                "alive": bool(self.blaster_alive[i]),
+            },
+            "mushrooms": [
+                {"pos": (x, y), "health": int(self.mushrooms[i, x, y])}
+                for x, y in zip(xs.tolist(), ys.tolist())
+            ],
+            "blasts": [
+                (int(self.blast_x[i, b]), int(self.blast_y[i, b]))
+                for b in np.flatnonzero(self.blast_alive[i])
+            ],
+            "step": int(self.steps[i]),
+            "timeout": self._timeout,
+            "score": int(self.score[i]),
+        }
+        if self.spider_alive[i]:
+            state["spider"] = {
+                "pos": (int(self.spider_x[i]), int(self.spider_y[i])),
+                "alive": True,
+            }
+        if self.flee_state[i] == FLEE_ALIVE:
+            state["flee"] = {
+                "pos": (int(self.flee_x[i]), int(self.flee_y[i])),
+                "alive": True,
+            }
+        return state
@@ -8,16 +8,23 @@ import os
 import pygame
 import websockets
 
+from codec import get_codec
+
 pygame.init()
 program_icon = pygame.image.load("data/icon2.png")
 pygame.display.set_icon(program_icon)
 
 
-async def agent_loop(server_address="localhost:8000", agent_name="student"):
+async def agent_loop(
+    server_address="localhost:8000", agent_name="student", codec_name="json"
+):
     """Example client loop."""
+    codec = get_codec(codec_name)
     async with websockets.connect(f"ws://{server_address}/player") as websocket:
         # Receive information about static game properties
-        await websocket.send(json.dumps({"cmd": "join", "name": agent_name}))
+        await websocket.send(
+            json.dumps({"cmd": "join", "name": agent_name, "codec": codec.name})
+        )
 
         # Next 3 lines are not needed for AI agent
         SCREEN = pygame.display.set_mode((299, 123))
@@ -26,7 +33,7 @@ async def agent_loop(server_address="localhost:8000", agent_name="student"):
 
         while True:
             try:
-                state = json.loads(
+                state = codec.decode(
                     await websocket.recv()
                 )  # receive game update, this must be called timely or your game will get out of sync with the server
                 print(
@@ -78,4 +85,5 @@ loop = asyncio.get_event_loop()
 SERVER = os.environ.get("SERVER", "localhost")
 PORT = os.environ.get("PORT", "8000")
 NAME = os.environ.get("NAME", getpass.getuser())
-loop.run_until_complete(agent_loop(f"{SERVER}:{PORT}", NAME))
+CODEC = os.environ.get("CODEC", "json")
+loop.run_until_complete(agent_loop(f"{SERVER}:{PORT}", NAME, CODEC))
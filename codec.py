@@ -0,0 +1,233 @@
+"""Wire codecs for messages sent by the server.
+
+Clients pick one with {"cmd": "join", ..., "codec": "binary"}, JSON being the
+default. The binary codec packs game states and game info into typed arrays
+with fixed width coordinates; any other message travels as JSON inside a
+binary frame. Decoding yields the same structure a JSON client would see.
+"""
+import json
+import struct
+import sys
+from array import array
+
+JSON = "json"
+BINARY = "binary"
+
+STATE, INFO, OTHER = b"S", b"I", b"J"
+
+STATE_KEYS = frozenset(
+    ("centipedes", "bug_blaster", "mushrooms", "blasts", "step", "timeout", "score")
+)
+OPTIONAL_KEYS = frozenset(("spider", "flee", "ts"))
+INFO_KEYS = frozenset(("size", "map", "fps", "timeout", "level"))
+
+HAS_SPIDER, HAS_FLEE, HAS_TS, BLASTER_ALIVE, SPIDER_ALIVE, FLEE_ALIVE = (
+    1 << bit for bit in range(6)
+)
+
+# type, flags, step, timeout, score, bug blaster x and y
+STATE_HEADER = struct.Struct("<cBIIq2H")
+POS = struct.Struct("<2H")
+COUNT = struct.Struct("<H")
+CENTIPEDE = struct.Struct("<BBH")  # name length, direction, body length
+# type, width, height, fps, timeout, level
+INFO_HEADER = struct.Struct("<c3HIH")
+
+_SWAP = sys.byteorder != "little"
+
+
+def _pack(typecode, values):
+    values = array(typecode, values)
+    if _SWAP:
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack(typecode, data, offset, count):
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    values.frombytes(data[offset:end])
+    if _SWAP:
+        values.byteswap()
+    return values, end
+
+
+def _pairs(values):
+    return [[values[i], values[i + 1]] for i in range(0, len(values), 2)]
+
+
+class JSONCodec:
+    name = JSON
+
+    def encode(self, message):
+        return json.dumps(message)
+
+    def decode(self, data):
+        return json.loads(data)
+
+    def attach(self, data, fields):
+        """Add fields to an encoded object without encoding it again."""
+        extra = json.dumps(fields)[1:]
+        return data[:-1] + (", " if len(data) > 2 else "") + extra
+
+
+class BinaryCodec:
+    name = BINARY
+
+    def encode(self, message):
+        keys = message.keys()
+        if STATE_KEYS <= keys and keys <= STATE_KEYS | OPTIONAL_KEYS:
+            return self._encode_state(message)
+        if keys == INFO_KEYS:
+            return self._encode_info(message)
+        return OTHER + json.dumps(message).encode()
+
+    def attach(self, data, fields):
+        """Add fields to an encoded message without encoding it again.
+
+        Game states only take a "ts" field, appended to the packed frame.
+        Fields are spliced into JSON payloads the way JSONCodec does it.
+        """
+        if data[:1] == OTHER:
+            extra = json.dumps(fields)[1:].encode()
+            return data[:-1] + (b", " if len(data) > 3 else b"") + extra
+        if data[:1] != STATE or fields.keys() - {"ts"} or data[1] & HAS_TS:
+            return self.encode({**self.decode(data), **fields})
+        ts = fields["ts"].encode()
+        return b"".join(
+            (data[:1], bytes((data[1] | HAS_TS,)), data[2:], bytes((len(ts),)), ts)
+        )
+
+    def decode(self, data):
+        kind = data[:1]
+        if kind == STATE:
+            return self._decode_state(data)
+        if kind == INFO:
+            return self._decode_info(data)
+        return json.loads(data[1:])
+
+    def _encode_state(self, state):
+        blaster = state["bug_blaster"]
+        flags = BLASTER_ALIVE if blaster["alive"] else 0
+        chunks = [b""]
+
+        for key, present, alive in (
+            ("spider", HAS_SPIDER, SPIDER_ALIVE),
+            ("flee", HAS_FLEE, FLEE_ALIVE),
+        ):
+            if key in state:
+                flags |= present | (alive if state[key]["alive"] else 0)
+                chunks.append(POS.pack(*state[key]["pos"]))
+
+        mushrooms = state["mushrooms"]
+        chunks.append(COUNT.pack(len(mushrooms)))
+        chunks.append(_pack("H", [c for m in mushrooms for c in m["pos"]]))
+        chunks.append(_pack("B", [m["health"] for m in mushrooms]))
+
+        blasts = state["blasts"]
+        chunks.append(COUNT.pack(len(blasts)))
+        chunks.append(_pack("H", [c for blast in blasts for c in blast]))
+
+        centipedes = state["centipedes"]
+        chunks.append(COUNT.pack(len(centipedes)))
+        for centipede in centipedes:
+            name = centipede["name"].encode()
+            body = centipede["body"]
+            chunks.append(CENTIPEDE.pack(len(name), centipede["direction"], len(body)))
+            chunks.append(name)
+            chunks.append(_pack("H", [c for pos in body for c in pos]))
+
+        if "ts" in state:
+            flags |= HAS_TS
+            ts = state["ts"].encode()
+            chunks.append(bytes((len(ts),)) + ts)
+
+        chunks[0] = STATE_HEADER.pack(
+            STATE,
+            flags,
+            state["step"],
+            state["timeout"],
+            state["score"],
+            *blaster["pos"],
+        )
+        return b"".join(chunks)
+
+    def _decode_state(self, data):
+        _, flags, step, timeout, score, bx, by = STATE_HEADER.unpack_from(data)
+        offset = STATE_HEADER.size
+        state = {}
+
+        extras = {}
+        for key, present, alive in (
+            ("spider", HAS_SPIDER, SPIDER_ALIVE),
+            ("flee", HAS_FLEE, FLEE_ALIVE),
+        ):
+            if flags & present:
+                x, y = POS.unpack_from(data, offset)
+                offset += POS.size
+                extras[key] = {"pos": [x, y], "alive": bool(flags & alive)}
+
+        (count,) = COUNT.unpack_from(data, offset)
+        positions, offset = _unpack("H", data, offset + COUNT.size, 2 * count)
+        healths, offset = _unpack("B", data, offset, count)
+        mushrooms = [
+            {"pos": pos, "health": health}
+            for pos, health in zip(_pairs(positions), healths)
+        ]
+
+        (count,) = COUNT.unpack_from(data, offset)
+        blasts, offset = _unpack("H", data, offset + COUNT.size, 2 * count)
+
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        centipedes = []
+        for _ in range(count):
+            name_len, direction, body_len = CENTIPEDE.unpack_from(data, offset)
+            offset += CENTIPEDE.size
+            name = data[offset : offset + name_len].decode()
+            body, offset = _unpack("H", data, offset + name_len, 2 * body_len)
+            centipedes.append(
+                {"name": name, "body": _pairs(body), "direction": direction}
+            )
+
+        state["centipedes"] = centipedes
+        state["bug_blaster"] = {"pos": [bx, by], "alive": bool(flags & BLASTER_ALIVE)}
+        state["mushrooms"] = mushrooms
+        state["blasts"] = _pairs(blasts)
+        state["step"] = step
+        state["timeout"] = timeout
+        state["score"] = score
+        state.update(extras)
+
+        if flags & HAS_TS:
+            ts_len = data[offset]
+            state["ts"] = data[offset + 1 : offset + 1 + ts_len].decode()
+        return state
+
+    def _encode_info(self, info):
+        width, height = info["size"]
+        header = INFO_HEADER.pack(
+            INFO, width, height, info["fps"], info["timeout"], info["level"]
+        )
+        return header + _pack("B", [tile for column in info["map"] for tile in column])
+
+    def _decode_info(self, data):
+        _, width, height, fps, timeout, level = INFO_HEADER.unpack_from(data)
+        tiles, _ = _unpack("B", data, INFO_HEADER.size, width * height)
+        return {
+            "size": [width, height],
+            "map": [
+                tiles[x * height : (x + 1) * height].tolist() for x in range(width)
+            ],
+            "fps": fps,
+            "timeout": timeout,
+            "level": level,
+        }
+
+
+CODECS = {codec.name: codec for codec in (JSONCodec(), BinaryCodec())}
+
+
+def get_codec(name=JSON):
+    """Codec registered under name, JSON for unknown names."""
+    return CODECS.get(name, CODECS[JSON])
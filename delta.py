@@ -0,0 +1,276 @@
+"""Delta encoding of the game state stream, with periodic keyframes.
+
+Clients joining with {"cmd": "join", ..., "delta": true} receive a full state
+tagged "keyframe" every KEYFRAME_INTERVAL frames and, in between, messages
+tagged "delta" that only carry what changed since the previous frame:
+
+    mushrooms:  {"set": [[x, y, health], ...], "remove": [[x, y], ...]}
+    centipedes: {"update": [{"name", "drop", "trim", "push", "direction"}],
+                 "add": [centipede], "remove": [name, ...]}
+                each update drops segments from the tail, trims segments from
+                the head side and then pushes new head segments
+    blasts:     {"expire": [index, ...], "spawn": [[x, y], ...]}
+                surviving blasts implicitly move one row up
+    removed:    keys no longer present in the state (spider, flee)
+
+Any other key holds its new value. Fields that cannot be expressed as a diff
+are sent whole. DeltaDecoder rebuilds the state seen by JSON clients, except
+that mushrooms may come in a different order.
+"""
+import logging
+
+logger = logging.getLogger("Delta")
+logger.setLevel(logging.DEBUG)
+
+KEYFRAME_INTERVAL = 50
+STREAMED = ("mushrooms", "centipedes", "blasts")
+MAX_DROP = 2  # tail segments a centipede can lose between two frames
+
+
+def _normalize(state):
+    """Copy of the parts of state that are compared between frames."""
+    return {
+        "scalars": {k: v for k, v in state.items() if k not in STREAMED},
+        "mushrooms": {tuple(m["pos"]): m["health"] for m in state["mushrooms"]},
+        "centipedes": [
+            (c["name"], [tuple(pos) for pos in c["body"]], c["direction"])
+            for c in state["centipedes"]
+        ],
+        "blasts": [tuple(blast) for blast in state["blasts"]],
+    }
+
+
+def _diff_body(old, new):
+    """Find the drop/trim/push that turns body old into body new."""
+    best = None
+    for drop in range(min(MAX_DROP, len(old)) + 1):
+        keep = 0
+        limit = min(len(old) - drop, len(new))
+        while keep < limit and old[drop + keep] == new[keep]:
+            keep += 1
+        if best is None or keep > best[1]:
+            best = (drop, keep)
+    drop, keep = best
+    return drop, len(old) - drop - keep, new[keep:]
+
+
+def _diff_centipedes(old, new):
+    names = [name for name, _, _ in new]
+    if len(set(names)) != len(names) or len({n for n, _, _ in old}) != len(old):
+        # names are the only identity we have, fall back on the full list
+        return [
+            {"name": name, "body": body, "direction": direction}
+            for name, body, direction in new
+        ]
+
+    previous = {name: (body, direction) for name, body, direction in old}
+    delta = {}
+    update, add = [], []
+    for name, body, direction in new:
+        if name not in previous:
+            add.append({"name": name, "body": body, "direction": direction})
+            continue
+        old_body, old_direction = previous[name]
+        entry = {}
+        drop, trim, push = _diff_body(old_body, body)
+        if len(push) > len(body) // 2 + 1:
+            entry["body"] = body
+        else:
+            if drop:
+                entry["drop"] = drop
+            if trim:
+                entry["trim"] = trim
+            if push:
+                entry["push"] = push
+        if direction != old_direction:
+            entry["direction"] = direction
+        if entry:
+            update.append({"name": name, **entry})
+
+    remove = [name for name in previous if name not in set(names)]
+    if update:
+        delta["update"] = update
+    if add:
+        delta["add"] = add
+    if remove:
+        delta["remove"] = remove
+    return delta
+
+
+def _diff_blasts(old, new):
+    expire = []
+    j = 0
+    for i, (x, y) in enumerate(old):
+        if j < len(new) and new[j] == (x, y - 1):
+            j += 1
+        else:
+            expire.append(i)
+    delta = {}
+    if expire:
+        delta["expire"] = expire
+    if new[j:]:
+        delta["spawn"] = new[j:]
+    return delta
+
+
+def _diff_mushrooms(old, new):
+    delta = {}
+    changed = [
+        (x, y, health) for (x, y), health in new.items() if old.get((x, y)) != health
+    ]
+    removed = [pos for pos in old if pos not in new]
+    if changed:
+        delta["set"] = changed
+    if removed:
+        delta["remove"] = removed
+    return delta
+
+
+def diff(old, new):
+    """Delta message turning normalized state old into normalized state new."""
+    delta = {"delta": True}
+    for key, value in new["scalars"].items():
+        if old["scalars"].get(key) != value:
+            delta[key] = value
+    removed = [key for key in old["scalars"] if key not in new["scalars"]]
+    if removed:
+        delta["removed"] = removed
+
+    for key, differ in (
+        ("mushrooms", _diff_mushrooms),
+        ("centipedes", _diff_centipedes),
+        ("blasts", _diff_blasts),
+    ):
+        if changes := differ(old[key], new[key]):
+            delta[key] = changes
+    return delta
+
+
+class DeltaEncoder:
+    """Turns the states of one game into keyframes and deltas."""
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self._interval = keyframe_interval
+        self._last = None
+        self._frames = 0
+
+    def reset(self):
+        """Start over with a keyframe, e.g. when a new game begins."""
+        self._last = None
+        self._frames = 0
+
+    @staticmethod
+    def keyframe(state):
+        return {**state, "keyframe": True}
+
+    def encode(self, state):
+        """Message carrying state, a keyframe or a delta from the last one."""
+        current = _normalize(state)
+        if self._last is None or self._frames % self._interval == 0:
+            message = self.keyframe(state)
+        else:
+            message = diff(self._last, current)
+        self._last = current
+        self._frames += 1
+        return message
+
+
+class DeltaDecoder:
+    """Rebuilds full states from a keyframe/delta stream."""
+
+    def __init__(self):
+        self._state = None
+
+    def decode(self, message):
+        """Returns the full state, other messages are passed through."""
+        if message.get("keyframe"):
+            state = dict(message)
+            del state["keyframe"]
+            self._state = _normalize(state)
+        elif message.get("delta"):
+            if self._state is None:
+                logger.warning("Delta received before any keyframe, ignored")
+                return None
+            self._apply(message)
+        else:
+            return message
+        return self.state
+
+    @property
+    def state(self):
+        if self._state is None:
+            return None
+        state = dict(self._state["scalars"])
+        state["mushrooms"] = [
+            {"pos": list(pos), "health": health}
+            for pos, health in self._state["mushrooms"].items()
+        ]
+        state["centipedes"] = [
+            {"name": name, "body": [list(pos) for pos in body], "direction": d}
+            for name, body, d in self._state["centipedes"]
+        ]
+        state["blasts"] = [list(blast) for blast in self._state["blasts"]]
+        return state
+
+    def _apply(self, delta):
+        state = self._state
+        for key, value in delta.items():
+            if key in ("delta", *STREAMED):
+                continue
+            if key == "removed":
+                for removed in value:
+                    state["scalars"].pop(removed, None)
+            else:
+                state["scalars"][key] = value
+
+        mushrooms = delta.get("mushrooms", {})
+        for pos in mushrooms.get("remove", []):
+            state["mushrooms"].pop(tuple(pos), None)
+        for x, y, health in mushrooms.get("set", []):
+            state["mushrooms"][(x, y)] = health
+
+        centipedes = delta.get("centipedes", {})
+        if isinstance(centipedes, list):
+            state["centipedes"] = _normalize(
+                {"mushrooms": [], "blasts": [], "centipedes": centipedes}
+            )["centipedes"]
+        else:
+            self._apply_centipedes(centipedes)
+
+        blasts = delta.get("blasts", {})
+        if isinstance(blasts, list):
+            state["blasts"] = [tuple(blast) for blast in blasts]
+        else:
+            expire = set(blasts.get("expire", []))
+            state["blasts"] = [
+                (x, y - 1)
+                for i, (x, y) in enumerate(state["blasts"])
+                if i not in expire
+            ] + [tuple(blast) for blast in blasts.get("spawn", [])]
+
+    def _apply_centipedes(self, delta):
+        removed = set(delta.get("remove", []))
+        updates = {entry["name"]: entry for entry in delta.get("update", [])}
+        centipedes = []
+        for name, body, direction in self._state["centipedes"]:
+            if name in removed:
+                continue
+            if (entry := updates.get(name)) is not None:
+                if "body" in entry:
+                    body = [tuple(pos) for pos in entry["body"]]
+                else:
+                    end = len(body) - entry.get("trim", 0)
+                    body = body[entry.get("drop", 0) : end] + [
+                        tuple(pos) for pos in entry.get("push", [])
+                    ]
+                direction = entry.get("direction", direction)
+            centipedes.append((name, body, direction))
+        for centipede in delta.get("add", []):
+            centipedes.append(
+                (
+                    centipede["name"],
+                    [tuple(pos) for pos in centipede["body"]],
+                    centipede["direction"],
+                )
+            )
+        self._state["centipedes"] = centipedes
@@ -0,0 +1,124 @@
+"""Gym style environment playing a Game, observed as NumPy planes.
+
+    env = CentipedeEnv(repeat=4)
+    obs, info = env.reset(seed=1)
+    while True:
+        obs, reward, terminated, truncated, info = env.step(FIRE)
+        if terminated or truncated:
+            break
+
+Observations are a (CHANNELS, width, height) uint8 array indexed [channel,
+x, y], written in place from the game entities at every step; it is the
+same array every time, copy it to keep an observation around. The planes
+live in a bytearray the array is a view of: setting a few hundred cells
+one by one is cheaper through it than through NumPy indexing. The mushrooms
+plane is only rewritten when MushroomField.version says it changed.
+"""
+
+import numpy as np
+
+from batch import ACTIONS, NOOP, UP, LEFT, DOWN, RIGHT, FIRE  # noqa: F401
+from consts import TIMEOUT
+from game import Game, MAP_SIZE
+
+# Observation channels
+MUSHROOMS, HEADS, BODIES, SPIDER, FLEE, BLASTS, BUG_BLASTER = range(7)
+CHANNELS = 7
+PLAYER = "agent"
+
+
+class CentipedeEnv:
+    """A Game stepped by action codes, each repeated repeat ticks.
+
+    The mushrooms plane holds their health. The heads and bodies planes,
+    bodies including the heads, number centipedes from 1 in the order of
+    Game.centipedes, so that touching centipedes can be told apart. Other
+    planes hold 1 where the entity is.
+    """
+
+    def __init__(self, repeat=1, timeout=TIMEOUT, size=MAP_SIZE, maps=None):
+        self.repeat = repeat  # ticks played per step
+        self.timeout = timeout
+        self.size = size
+        self.maps = maps  # MapPool to take the maps from, if any
+        self.actions = ACTIONS
+        self.game = None
+        self._planes = bytearray(CHANNELS * size[0] * size[1])
+        self._plane = size[0] * size[1]
+        self._blank = bytes(len(self._planes) - self._plane)  # but mushrooms
+        self._seen = (None, None)  # MushroomField and version in the plane
+        self.observation = np.frombuffer(self._planes, dtype=np.uint8).reshape(
+            CHANNELS, *size
+        )
+
+    @property
+    def observation_shape(self):
+        return self.observation.shape
+
+    def reset(self, seed=None):
+        """Start a new game, returns (observation, info)."""
+        self.game = Game(
+            timeout=self.timeout, size=self.size, seed=seed, maps=self.maps
+        )
+        self.game.start([PLAYER])
+        return self._observe(), self._info()
+
+    def step(self, action):
+        """Play action for repeat ticks, or until the game is over.
+
+        Returns (observation, reward, terminated, truncated, info), reward
+        being the score earned. The game is truncated when it times out and
+        terminated when it is over for any other reason.
+        """
+        game = self.game
+        key = ACTIONS[action]
+        score = game.score
+        for _ in range(self.repeat):
+            if game.step(key) is None or not game.running:
+                break
+        truncated = game._step >= self.timeout
+        terminated = not game.running and not truncated
+        return (
+            self._observe(),
+            game.score - score,
+            terminated,
+            truncated,
+            self._info(),
+        )
+
+    def _info(self):
+        return {"step": self.game._step, "score": self.game.score}
+
+    def _observe(self):
+        game = self.game
+        planes = self._planes
+        height, plane = self.size[1], self._plane
+        planes[plane:] = self._blank
+
+        field = game._mushrooms
+        if self._seen != (field, field.version):
+            planes[:plane] = bytes(plane)  # MUSHROOMS is plane 0
+            for (x, y), health in field.snapshot():
+                planes[x * height + y] = health
+            self._seen = (field, field.version)
+
+        heads, bodies = HEADS * plane, BODIES * plane
+        for k, centipede in enumerate(game.centipedes, 1):
+            if centipede.alive and centipede.segments:
+                for x, y in centipede.segments:
+                    planes[bodies + x * height + y] = k
+                x, y = centipede.head
+                planes[heads + x * height + y] = k
+
+        for x, y in game._blasts:
+            planes[BLASTS * plane + x * height + y] = 1
+
+        for channel, entity in (
+            (SPIDER, game._spider),
+            (FLEE, game._flee),
+            (BUG_BLASTER, game.bug_blaster),
+        ):
+            if entity is not None and entity.exists():
+                x, y = entity.pos
+                planes[channel * plane + x * height + y] = 1
+        return self.observation
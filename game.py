@@ -1,8 +1,7 @@
-import asyncio
 import logging
 import random
 import math
-from collections import deque
+from collections import deque, namedtuple
 from unicodedata import name
 
 
@@ -18,6 +17,7 @@ from consts import (
     MUSHROOM_SPAWN_RATE,
 )
 from mapa import Map
+from scheduler import TickScheduler
 
 logger = logging.getLogger("Game")
 logger.setLevel(logging.DEBUG)
@@ -28,6 +28,28 @@ MAP_SIZE = (40, 24)
 
 
 class Centipede:
+    """A centipede, its body listed from tail to head.
+
+    The body is kept in a deque, along with the number of segments on each
+    cell, so that moving, membership tests and splits avoid list copies.
+    """
+
+    __slots__ = (
+        "_name",
+        "_body",
+        "_cells",
+        "_direction",
+        "_history",
+        "_alive",
+        "_json",
+        "lastkey",
+        "to_grow",
+        "range",
+        "reverse_next_move",
+        "move_dir",
+        "waiting_to_move_vertically",
+    )
+
     def __init__(
         self,
         player_name: str,
@@ -35,11 +57,15 @@ class Centipede:
         dir: Direction = Direction.EAST,
     ):
         self._name = player_name
-        self._body = segments
-        logger.info(f"Centipede {self._name} created with body {self._body}")
+        self._body = deque(segments)
+        self._cells = {}
+        for pos in self._body:
+            self._cells[pos] = self._cells.get(pos, 0) + 1
+        logger.info("Centipede %s created with body %s", self._name, segments)
         self._direction = dir
         self._history = deque(maxlen=HISTORY_LEN)
         self._alive = True
+        self._json = None
         self.lastkey = ""
         self.to_grow = 1
         self.range = 3
@@ -57,12 +83,31 @@ class Centipede:
 
     @property
     def tail(self):
-        return self._body[:-1]
+        return list(self._body)[:-1]
 
     @property
     def body(self):
+        return list(self._body)
+
+    @property
+    def segments(self):
+        """The body deque itself, for iterating without a copy."""
         return self._body
 
+    def _push_head(self, pos):
+        self._body.append(pos)
+        self._cells[pos] = self._cells.get(pos, 0) + 1
+        self._json = None
+
+    def _pop(self, tail):
+        pos = self._body.popleft() if tail else self._body.pop()
+        if self._cells[pos] == 1:
+            del self._cells[pos]
+        else:
+            self._cells[pos] -= 1
+        self._json = None
+        return pos
+
     @property
     def alive(self):
         return self._alive
@@ -96,30 +141,80 @@ class Centipede:
 
     @property
     def json(self):
-        return {"name": self._name, "body": self._body, "direction": self._direction}
+        json = self._json
+        if json is None or json["direction"] != self._direction:
+            json = self._json = {
+                "name": self._name,
+                "body": list(self._body),
+                "direction": self._direction,
+            }
+        return json
 
     def exists(self):
         return len(self._body) > 0 and self._alive
 
-    def move(self, mapa, mushrooms, centipedes):
+    def snapshot(self):
+        return (
+            self._name,
+            tuple(self._body),
+            self._direction,
+            self._alive,
+            self.to_grow,
+            self.reverse_next_move,
+            self.move_dir,
+            self.waiting_to_move_vertically,
+            tuple(self._history),
+        )
+
+    @classmethod
+    def from_snapshot(cls, data):
+        centipede = cls.__new__(cls)
+        (
+            centipede._name,
+            body,
+            centipede._direction,
+            centipede._alive,
+            centipede.to_grow,
+            centipede.reverse_next_move,
+            centipede.move_dir,
+            centipede.waiting_to_move_vertically,
+            history,
+        ) = data
+        centipede._body = deque(body)
+        centipede._cells = {}
+        for pos in body:
+            centipede._cells[pos] = centipede._cells.get(pos, 0) + 1
+        centipede._history = deque(history, maxlen=HISTORY_LEN)
+        centipede._json = None
+        centipede.lastkey = ""
+        centipede.range = 3
+        return centipede
+
+    def move(self, mapa, mushrooms, centipedes, occupancy=None):
         # check map collisions
         new_pos = mapa.calc_pos(self.head, self.direction, traverse=False)
 
         # check collisions with other centipedes
-        for centipede in centipedes:
-            if (
-                centipede.exists()
-                and centipede.name != self.name
-                and new_pos in centipede.body
-            ):
-                logger.info(
-                    "Centipede <%s> collided with <%s>", centipede.name, self.name
-                )
+        if occupancy is not None:
+            if occupancy.blocked(new_pos, self, centipedes):
+                logger.info("Centipede <%s> collided at %s", self.name, new_pos)
                 self.reverse_direction()
                 return
+        else:
+            for centipede in centipedes:
+                if (
+                    centipede.exists()
+                    and centipede.name != self.name
+                    and centipede.collision(new_pos)
+                ):
+                    logger.info(
+                        "Centipede <%s> collided with <%s>", centipede.name, self.name
+                    )
+                    self.reverse_direction()
+                    return
 
         # check mushroom collisions
-        if new_pos in [mushroom.pos for mushroom in mushrooms]:
+        if new_pos in mushrooms:
             new_pos = self.head
 
         # wall hit
@@ -141,9 +236,7 @@ class Centipede:
             new_pos_vert = (self.head[0], self.head[1] + self.move_dir)
 
             # check if it's blocked vertically
-            if 0 <= new_pos_vert[1] < mapa.size[1] and new_pos_vert not in [
-                m.pos for m in mushrooms
-            ]:
+            if 0 <= new_pos_vert[1] < mapa.size[1] and new_pos_vert not in mushrooms:
                 # it moves vertically on this tick
                 new_pos = new_pos_vert
             else:
@@ -162,22 +255,24 @@ class Centipede:
             new_pos_vert = (self.head[0], self.head[1] + self.move_dir)
 
             # check if it's blocked vertically
-            if 0 <= new_pos_vert[1] < mapa.size[1] and new_pos_vert not in [
-                m.pos for m in mushrooms
-            ]:
+            if 0 <= new_pos_vert[1] < mapa.size[1] and new_pos_vert not in mushrooms:
                 new_pos = new_pos_vert
                 self.waiting_to_move_vertically = False
 
-        self._body.append(new_pos)
-        self._body.pop(0)
+        self._push_head(new_pos)
+        tail = self._pop(tail=True)
+        if occupancy is not None:
+            occupancy.add(new_pos, self)
+            occupancy.remove(tail, self)
 
         self._history.append(new_pos)
 
     def collision(self, pos):
-        return pos in self._body
+        return pos in self._cells
 
     def reverse_direction(self):
         self._body.reverse()
+        self._json = None
         if self.direction == Direction.EAST:
             self._direction = Direction.WEST
         elif self.direction == Direction.WEST:
@@ -188,14 +283,23 @@ class Centipede:
             self._direction = Direction.NORTH
 
     def take_hit(self, blast):
-        if blast in self._body:
+        """Split the body at blast, returns the segments ahead of it.
+
+        The centipede keeps the segments behind blast, only the segments
+        ahead are moved out.
+        """
+        if blast in self._cells:
             index = self._body.index(blast)
-            old_body = self._body.copy()
-            new_body = self._body[index + 1 :]
-            self._body = self._body[:index]
+            new_body = [self._pop(tail=False) for _ in range(len(self._body) - index)]
+            new_body.pop()  # the segment hit
+            new_body.reverse()
 
             logger.debug(
-                f"Centipede {self.name}({old_body}) was hit at {blast}, new body {self._body}, new centipede {new_body}"
+                "Centipede %s was hit at %s, new body %s, new centipede %s",
+                self.name,
+                blast,
+                self._body,
+                new_body,
             )
 
             if len(self._body) < 1:
@@ -220,16 +324,31 @@ class Centipede:
         return None
 
 
+def _entity_json(entity):
+    """json of a Spider, Flee or BugBlaster.
+
+    The dict is reused until the entity moves or dies, a new one is made
+    then, so states of earlier frames keep the values they were sent with.
+    """
+    json = entity._json
+    if json is None or json["pos"] != entity._pos or json["alive"] != entity._alive:
+        json = entity._json = {"pos": entity._pos, "alive": entity._alive}
+    return json
+
+
 class Spider:
-    def __init__(self, pos):
+    __slots__ = ("_pos", "_alive", "_json", "_origin_y", "_vx", "_t", "_frequency")
+
+    def __init__(self, pos, rng=random):
         self._pos = pos
         self._alive = True
+        self._json = None
         # _origin_y is the baseline vertical position for the sinusoidal motion
         self._origin_y = pos[1]
         self._vx = 1
         # internal time/phase for the sine function
         self._t = 0.0
-        self._frequency = random.uniform(0.1, 1.0)
+        self._frequency = rng.uniform(0.1, 1.0)
 
     def move(self, mapa):
         """
@@ -264,13 +383,37 @@ class Spider:
     def exists(self):
         return self._alive
 
+    def snapshot(self):
+        return (
+            self._pos,
+            self._alive,
+            self._origin_y,
+            self._vx,
+            self._t,
+            self._frequency,
+        )
+
+    @classmethod
+    def from_snapshot(cls, data):
+        spider = cls.__new__(cls)
+        (
+            spider._pos,
+            spider._alive,
+            spider._origin_y,
+            spider._vx,
+            spider._t,
+            spider._frequency,
+        ) = data
+        spider._json = None
+        return spider
+
     @property
     def pos(self):
         return self._pos
 
     @property
     def json(self):
-        return {"pos": self._pos, "alive": self._alive}
+        return _entity_json(self)
 
     def kill(self):
         self._alive = False
@@ -278,13 +421,25 @@ class Spider:
 
 
 class Flee:
+    __slots__ = ("_pos", "_alive", "_json")
+
     def __init__(self, pos):
         self._pos = pos
         self._alive = True
+        self._json = None
 
     def exists(self):
         return self._alive
-    
+
+    def snapshot(self):
+        return (self._pos, self._alive)
+
+    @classmethod
+    def from_snapshot(cls, data):
+        flee = cls(data[0])
+        flee._alive = data[1]
+        return flee
+
     def move(self, mapa):
         new_pos = (self._pos[0], self._pos[1] + 1)
         if new_pos[1] >= mapa.size[1]:
@@ -298,7 +453,7 @@ class Flee:
 
     @property
     def json(self):
-        return {"pos": self._pos, "alive": self._alive}
+        return _entity_json(self)
 
     def kill(self):
         self._alive = False
@@ -306,9 +461,12 @@ class Flee:
 
 
 class BugBlaster:
+    __slots__ = ("_pos", "_alive", "_json", "lastkey", "_direction")
+
     def __init__(self, pos):
         self._pos = pos
         self._alive = True
+        self._json = None
         self.lastkey = ""
         self._direction: Direction = Direction.EAST
 
@@ -336,19 +494,28 @@ class BugBlaster:
                 new_pos = (self._pos[0] + 1, self._pos[1])
         self._direction = direction
 
-        if new_pos not in [mushroom.pos for mushroom in mushrooms]:
+        if new_pos not in mushrooms:
             self._pos = new_pos
 
     def exists(self):
         return self._alive
 
+    def snapshot(self):
+        return (self._pos, self._alive, self._direction, self.lastkey)
+
+    @classmethod
+    def from_snapshot(cls, data):
+        bug_blaster = cls(data[0])
+        _, bug_blaster._alive, bug_blaster._direction, bug_blaster.lastkey = data
+        return bug_blaster
+
     @property
     def pos(self):
         return self._pos
 
     @property
     def json(self):
-        return {"pos": self._pos, "alive": self._alive}
+        return _entity_json(self)
 
     def kill(self):
         self._alive = False
@@ -356,9 +523,12 @@ class BugBlaster:
 
 
 class Mushroom:
+    __slots__ = ("_pos", "_health", "_json")
+
     def __init__(self, x=1, y=1):
         self._pos = (x, y)
         self._health = 4
+        self._json = None
 
     def __str__(self):
         return f"Mushroom({self._pos}, health={self._health})"
@@ -382,7 +552,211 @@ class Mushroom:
 
     @property
     def json(self):
-        return {"pos": self._pos, "health": self._health}
+        json = self._json
+        if json is None or json["health"] != self._health:
+            json = self._json = {"pos": self._pos, "health": self._health}
+        return json
+
+
+class MushroomField:
+    """Mushrooms indexed by position.
+
+    Destroyed mushrooms are dropped as soon as they take their last hit, so
+    membership always reflects the mushrooms still standing.
+    """
+
+    def __init__(self, mushrooms=()):
+        self._mushrooms = {}
+        self.version = 0  # bumped by every change, to tell the field changed
+        for mushroom in mushrooms:
+            self.add(mushroom)
+
+    def __contains__(self, pos):
+        return pos in self._mushrooms
+
+    def __iter__(self):
+        return iter(self._mushrooms.values())
+
+    def __len__(self):
+        return len(self._mushrooms)
+
+    def get(self, pos):
+        return self._mushrooms.get(pos)
+
+    def add(self, mushroom):
+        """Place mushroom, replacing any mushroom already at its position."""
+        self._mushrooms.pop(mushroom.pos, None)
+        self._mushrooms[mushroom.pos] = mushroom
+        self.version += 1
+
+    def remove(self, pos):
+        self.version += 1
+        return self._mushrooms.pop(pos, None)
+
+    def snapshot(self):
+        return tuple(
+            (pos, mushroom.health) for pos, mushroom in self._mushrooms.items()
+        )
+
+    @classmethod
+    def from_snapshot(cls, data):
+        field = cls()
+        for (x, y), health in data:
+            mushroom = Mushroom(x, y)
+            mushroom._health = health
+            field._mushrooms[(x, y)] = mushroom
+        return field
+
+    def damage(self, pos):
+        """Damage the mushroom at pos, returns it or None if there is none."""
+        mushroom = self._mushrooms.get(pos)
+        if mushroom is None:
+            return None
+        mushroom.take_damage()
+        self.version += 1
+        if not mushroom.exists():
+            del self._mushrooms[pos]
+        return mushroom
+
+
+class Occupancy:
+    """Centipede segments per map cell, kept current as centipedes move.
+
+    Each cell keeps how many segments lie on it and the centipede owning
+    them, or SHARED when segments of several centipedes overlap there.
+    """
+
+    SHARED = object()
+
+    def __init__(self, size):
+        self._height = size[1]
+        self._cells = size[0] * size[1]
+        self._count = [0] * self._cells
+        self._owner = [None] * self._cells
+
+    def _index(self, pos):
+        x, y = pos
+        if 0 <= y < self._height and 0 <= (i := x * self._height + y) < self._cells:
+            return i
+        return None
+
+    def rebuild(self, centipedes):
+        self._count = [0] * self._cells
+        self._owner = [None] * self._cells
+        for centipede in centipedes:
+            if centipede.exists():
+                for pos in centipede.segments:
+                    self.add(pos, centipede)
+
+    def add(self, pos, centipede):
+        if (i := self._index(pos)) is None:
+            return
+        if self._count[i] == 0:
+            self._owner[i] = centipede
+        elif self._owner[i] is not centipede:
+            self._owner[i] = self.SHARED
+        self._count[i] += 1
+
+    def remove(self, pos, centipede):
+        if (i := self._index(pos)) is None or self._count[i] == 0:
+            return
+        self._count[i] -= 1
+        if self._count[i] == 0:
+            self._owner[i] = None
+
+    def transfer(self, body, old, new):
+        """Hand the segments in body over from centipede old to new."""
+        for pos in body:
+            self.remove(pos, old)
+            self.add(pos, new)
+
+    def owner(self, pos):
+        if (i := self._index(pos)) is None:
+            return None
+        return self._owner[i]
+
+    def holds(self, pos, centipede):
+        """Is any segment of centipede at pos."""
+        owner = self.owner(pos)
+        if owner is self.SHARED:
+            return centipede.collision(pos)
+        return owner is centipede
+
+    def blocked(self, pos, centipede, centipedes):
+        """Is pos taken by a centipede other than the given one."""
+        owner = self.owner(pos)
+        if owner is None or owner is centipede:
+            return False
+        if owner is self.SHARED:
+            return any(
+                other is not centipede and other.exists() and other.collision(pos)
+                for other in centipedes
+            )
+        return owner.exists()
+
+
+Snapshot = namedtuple(
+    "Snapshot",
+    [
+        "running",
+        "step",
+        "score",
+        "kills",
+        "cooldown",
+        "last_key",
+        "pressed",
+        "inputs",
+        "rng",
+        "map",
+        "centipedes",
+        "bug_blaster",
+        "spider",
+        "flee",
+        "mushrooms",
+        "blasts",
+        "state",
+    ],
+)
+
+
+def substream(seed, *keys):
+    """Independent random generator for the stream named keys under seed."""
+    return random.Random("/".join(map(str, (seed, *keys))))
+
+
+def generate_map(seed, size, mushroom_percentage=0.1, level=1):
+    """The map a game with seed plays on."""
+    return Map(
+        level=level,
+        size=size,
+        mushroom_percentage=mushroom_percentage,
+        rng=substream(seed, "map"),
+    )
+
+
+NO_KEY = 0  # no keypress since the previous frame
+EMPTY_KEY = 1
+OTHER_KEY = 0xFF  # any key outside printable ASCII, all equally invalid
+
+
+def key2code(key):
+    """Encode a keypress (None when there was none) in a single byte."""
+    if key is None:
+        return NO_KEY
+    if key == "":
+        return EMPTY_KEY
+    if len(key) == 1 and 32 <= ord(key) < 127:
+        return ord(key)
+    return OTHER_KEY
+
+
+def code2key(code):
+    """Keypress encoded by key2code()."""
+    if code == NO_KEY:
+        return None
+    if code == EMPTY_KEY:
+        return ""
+    return chr(code)
 
 
 def key2direction(key):
@@ -398,8 +772,20 @@ def key2direction(key):
 
 
 class Game:
-    def __init__(self, level=1, timeout=TIMEOUT, size=MAP_SIZE, game_speed=GAME_SPEED):
+    def __init__(
+        self,
+        level=1,
+        timeout=TIMEOUT,
+        size=MAP_SIZE,
+        game_speed=GAME_SPEED,
+        seed=None,
+        maps=None,
+    ):
         logger.info(f"Game(level={level})")
+        if seed is None:
+            seed = random.getrandbits(64)
+        self._seed = seed
+        self._rng = substream(seed, "game")
         self.initial_level = level
         self._game_speed = game_speed
         self._running = False
@@ -409,12 +795,26 @@ class Game:
         self._centipedes = []
         self._bug_blaster = None
         self._blasts = []
-        self._spider = Spider(pos=(0, random.randint(0, size[1] // 2)))
+        self._mushrooms = MushroomField()
+        self._occupancy = Occupancy(size)
+        self._occupied = None  # the _centipedes list _occupancy was built from
+        self._spider = Spider(
+            pos=(0, self._rng.randint(0, size[1] // 2)), rng=self._rng
+        )
         self._flee = None
         self._last_key = ""
+        self._pressed = None  # key pressed since the last frame
+        self._inputs = bytearray()  # one key2code() per frame
+        self.archive = None  # ArchiveWriter recording every frame
+        self.profiler = None  # TickProfiler timing every phase of a frame
+        self._scheduler = None  # TickScheduler pacing next_frame()
         self._score = 0
+        self._kills = {"centipede": 0, "mushroom": 0, "spider": 0, "flee": 0}
         self._cooldown = 0  # frames until next shot
-        self.map = Map(size=size)
+        if maps is not None:  # a MapPool with the map ready
+            self.map = maps.get(seed, size)
+        else:
+            self.map = generate_map(seed, size)
 
     @property
     def score(self):
@@ -424,6 +824,19 @@ class Game:
     def score(self, value):
         self._score = value
 
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def inputs(self):
+        """Keys pressed before each frame, encoded with key2code()."""
+        return bytes(self._inputs)
+
+    @property
+    def kills(self):
+        return self._kills
+
     @property
     def centipedes(self):
         return self._centipedes
@@ -444,12 +857,71 @@ class Game:
     def total_steps(self):
         return self._total_steps
 
+    def snapshot(self):
+        """Capture everything a frame can change, see restore().
+
+        Entities are saved as tuples of plain values, the map tiles are
+        shared with the game.
+        """
+        return Snapshot(
+            self._running,
+            self._step,
+            self._score,
+            dict(self._kills),
+            self._cooldown,
+            self._last_key,
+            self._pressed,
+            bytes(self._inputs),
+            self._rng.getstate(),
+            self.map.snapshot(),
+            tuple(centipede.snapshot() for centipede in self._centipedes),
+            self._bug_blaster.snapshot() if self._bug_blaster else None,
+            self._spider.snapshot(),
+            self._flee.snapshot() if self._flee else None,
+            self._mushrooms.snapshot(),
+            tuple(self._blasts),
+            self._state,
+        )
+
+    def restore(self, snapshot):
+        """Bring the game back to the moment snapshot() was taken.
+
+        A snapshot can be restored any number of times, e.g. once per rollout.
+        """
+        self._running = snapshot.running
+        self._step = snapshot.step
+        self._score = snapshot.score
+        self._kills = dict(snapshot.kills)
+        self._cooldown = snapshot.cooldown
+        self._last_key = snapshot.last_key
+        self._pressed = snapshot.pressed
+        self._inputs = bytearray(snapshot.inputs)
+        self._rng.setstate(snapshot.rng)
+        self.map.restore(snapshot.map)
+        self._centipedes = [
+            Centipede.from_snapshot(data) for data in snapshot.centipedes
+        ]
+        self._bug_blaster = (
+            BugBlaster.from_snapshot(snapshot.bug_blaster)
+            if snapshot.bug_blaster
+            else None
+        )
+        self._spider = Spider.from_snapshot(snapshot.spider)
+        self._flee = Flee.from_snapshot(snapshot.flee) if snapshot.flee else None
+        self._mushrooms = MushroomField.from_snapshot(snapshot.mushrooms)
+        self._blasts = list(snapshot.blasts)
+        self._state = snapshot.state
+        self._rebuild_occupancy()
+
     def start(self, players_names):
         logger.debug("Reset world")
         self._running = True
         self._centipedes = [Centipede("mother", self.map.spawn_centipede())]
+        self._rebuild_occupancy()
         self._bug_blaster = BugBlaster(self.map.spawn_bug_blaster())
-        self._mushrooms = [Mushroom(x, y) for x, y, _ in self.map.mushrooms]
+        self._mushrooms = MushroomField(
+            Mushroom(x, y) for x, y, _ in self.map.mushrooms
+        )
         self._blasts = []
 
     def stop(self):
@@ -460,8 +932,14 @@ class Game:
         logger.debug("Quit")
         self._running = False
 
+    def _rebuild_occupancy(self):
+        """Fill the occupancy grid from scratch, moves and hits then keep it current."""
+        self._occupancy.rebuild(self._centipedes)
+        self._occupied = self._centipedes
+
     def keypress(self, player_name, key):
         self._last_key = key
+        self._pressed = key
 
 
     def update_flee(self):
@@ -489,8 +967,8 @@ class Game:
             self._bug_blaster.kill()
             logger.info("BugBlaster was killed by spider at %s", self._spider.pos)
 
-        if self._spider.pos in [m.pos for m in self._mushrooms]:
-            self._mushrooms = [m for m in self._mushrooms if m.pos != self._spider.pos]
+        if self._spider.pos in self._mushrooms:
+            self._mushrooms.remove(self._spider.pos)
             logger.info("Mushroom at %s was destroyed by spider", self._spider.pos)
 
         if self._spider.pos == self._bug_blaster.pos:
@@ -502,27 +980,27 @@ class Game:
         to_be_removed = set()
 
         for blast in self._blasts:
-            for mushroom in self._mushrooms:
-                if mushroom.collision(blast):
-                    to_be_removed.add(blast)
-                    mushroom.take_damage()
-                    logger.debug("Mushroom %s was hit by a blast", mushroom)
-                    if not mushroom.exists():
-                        logger.debug("Mushroom %s was destroyed", mushroom)
-                        self._score += KILL_MUSHROOM_POINTS
-                    break
+            if (mushroom := self._mushrooms.damage(blast)) is not None:
+                to_be_removed.add(blast)
+                logger.debug("Mushroom %s was hit by a blast", mushroom)
+                if not mushroom.exists():
+                    logger.debug("Mushroom %s was destroyed", mushroom)
+                    self._score += KILL_MUSHROOM_POINTS
+                    self._kills["mushroom"] += 1
 
             if self._spider.exists() and blast == self._spider.pos:
                 to_be_removed.add(blast)
                 self._spider.kill()
                 self._score += KILL_SPIDER_POINTS
-                logger.debug("Spider was hit by a blast", self._spider)
+                self._kills["spider"] += 1
+                logger.debug("Spider %s was hit by a blast", self._spider.pos)
 
             if self._flee and self._flee.exists() and blast == self._flee.pos:
                 to_be_removed.add(blast)
                 self._flee.kill()
                 self._score += KILL_FLEE_POINTS
-                logger.debug("Flee was hit by a blast", self._flee)
+                self._kills["flee"] += 1
+                logger.debug("Flee %s was hit by a blast", self._flee.pos)
 
         for blast in to_be_removed:
             logger.debug("Blast %s removed after hitting a mushroom", blast)
@@ -573,32 +1051,35 @@ class Game:
             # check collisions with blasters
             to_be_removed = set()
             for blast in self._blasts:
-                if centipede.collision(blast):
+                if self._occupancy.holds(blast, centipede):
                     if (new_body := centipede.take_hit(blast)) != []:
                         new_centipede = Centipede(
-                            centipede.name + "_" + str(random.randint(1, 100)),
+                            centipede.name + "_" + str(self._rng.randint(1, 100)),
                             new_body,
                             centipede.direction,
                         )  # TODO proper naming for child centipede
 
                         self._centipedes.append(new_centipede)
+                        self._occupancy.transfer(new_body, centipede, new_centipede)
+                    self._occupancy.remove(blast, centipede)
 
                     self._score += (
                         KILL_CENTIPEDE_BODY_POINTS - blast[1]
                     )  # higher points for hitting higher up the screen
+                    self._kills["centipede"] += 1
                     logger.info(
                         "Centipede <%s> was hit by a blast and split",
                         centipede.name,
                     )
 
-                    self._mushrooms.append(Mushroom(x=blast[0], y=blast[1]))
+                    self._mushrooms.add(Mushroom(x=blast[0], y=blast[1]))
 
                     to_be_removed.add(blast)
             self._blasts = [b for b in self._blasts if b not in to_be_removed]
 
             # check collisions with bug blaster
-            if self._bug_blaster.exists() and centipede.collision(
-                self._bug_blaster._pos
+            if self._bug_blaster.exists() and self._occupancy.holds(
+                self._bug_blaster.pos, centipede
             ):
                 self._bug_blaster.kill()
                 logger.info("BugBlaster was killed by centipede <%s>", centipede.name)
@@ -606,12 +1087,30 @@ class Game:
             # TODO move blasts collision with mushrooms to here
 
     async def next_frame(self):
-        await asyncio.sleep(1.0 / self._game_speed)
+        if self._scheduler is None:
+            self._scheduler = TickScheduler(self._game_speed)
+        await self._scheduler.wait()
 
         if not self._running:
             logger.info("Waiting for player 1")
             return
 
+        return self.step()
+
+    def step(self, key=None):
+        """Advance the game a single tick, without any pacing.
+
+        If key is given it is applied as if pressed right before the tick.
+        Returns the new state, or None if the game is not running.
+        """
+        if not self._running:
+            return
+
+        if key is not None:
+            self.keypress(None, key)
+        self._inputs.append(key2code(self._pressed))
+        self._pressed = None
+
         self._step += 1
         if self._step == self._timeout:
             self.stop()
@@ -619,32 +1118,50 @@ class Game:
         if self._step % 100 == 0:
             logger.debug(f"[{self._step}] SCORE {name}: {self.score}")
 
+        if (profiler := self.profiler) is not None:
+            profiler.start(self._step)
+
+        if self._occupied is not self._centipedes:  # replaced from outside
+            self._rebuild_occupancy()
         for centipede in self._centipedes:
             if centipede.alive:
-                centipede.move(self.map, self._mushrooms, self.centipedes)
+                centipede.move(
+                    self.map, self._mushrooms, self.centipedes, self._occupancy
+                )
+        if profiler is not None:
+            profiler.lap("centipedes")
 
         self.update_spider()
+        if profiler is not None:
+            profiler.lap("spider")
         self.update_flee()
+        if profiler is not None:
+            profiler.lap("flee")
         self.collision()
+        if profiler is not None:
+            profiler.lap("collision")
         self.update_bug_blaster()
+        if profiler is not None:
+            profiler.lap("bug_blaster")
         self.update_blasts()
+        if profiler is not None:
+            profiler.lap("blasts")
 
         self.collision()
-
-        # clean up dead mushrooms
-        self._mushrooms = [
-            mushroom for mushroom in self._mushrooms if mushroom.exists()
-        ]
+        if profiler is not None:
+            profiler.lap("collision")
 
         # spawn new mushrooms over time
         if self._step % MUSHROOM_SPAWN_RATE == 0 and self._flee is None:
             logger.info("Spawning new mushroom")
-            x, y = self.map.spawn_mushroom()
-            if (x, y) != self._bug_blaster.pos:
-                self._mushrooms.append(Mushroom(x=x, y=y))
+            pos = self.map.spawn_mushroom()
+            if pos is not None and pos != self._bug_blaster.pos:
+                self._mushrooms.add(Mushroom(*pos))
                 # spawn flee
-                self._flee = Flee(pos=(x, y))
-                logger.info("Flee spawned at %s", (x, y))
+                self._flee = Flee(pos=pos)
+                logger.info("Flee spawned at %s", pos)
+        if profiler is not None:
+            profiler.lap("spawn")
 
         self._state = {
             "centipedes": [
@@ -667,6 +1184,16 @@ class Game:
             [not centipede.alive for centipede in self._centipedes]
         ):
             self.stop()
+        if profiler is not None:
+            profiler.lap("state")
+
+        if self.archive is not None:
+            self.archive.write(self._state)
+            if profiler is not None:
+                profiler.lap("archive")
+
+        if profiler is not None:
+            profiler.end()
 
         return self._state
 
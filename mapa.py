@@ -1,5 +1,8 @@
 import logging
 import random
+from collections import deque
+
+import numpy as np
 
 from consts import Direction, Tiles, CENTIPEDE_LENGTH
 
@@ -7,89 +10,325 @@ logger = logging.getLogger("Map")
 logger.setLevel(logging.DEBUG)
 
 BOTTOM_ROWS = 5
+EDGE = 0xFF  # padding around the map, blocks every move off the map
+STEPS = {
+    Direction.NORTH: (0, -1),
+    Direction.EAST: (1, 0),
+    Direction.SOUTH: (0, 1),
+    Direction.WEST: (-1, 0),
+}
+
+
+class FreeCells:
+    """Set of cells with O(1) add, discard and uniform sampling.
+
+    With rows given, cells outside those rows are never added.
+    """
+
+    def __init__(self, cells=(), rows=None):
+        self._rows = rows
+        if rows is not None:
+            cells = [cell for cell in cells if cell[1] in rows]
+        self._cells = list(dict.fromkeys(cells))
+        self._index = dict(zip(self._cells, range(len(self._cells))))
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __contains__(self, cell):
+        return cell in self._index
+
+    def add(self, cell):
+        if cell in self._index or (
+            self._rows is not None and cell[1] not in self._rows
+        ):
+            return
+        self._index[cell] = len(self._cells)
+        self._cells.append(cell)
+
+    def discard(self, cell):
+        if (i := self._index.pop(cell, None)) is None:
+            return
+        last = self._cells.pop()
+        if i < len(self._cells):
+            self._cells[i] = last
+            self._index[last] = i
+
+    def sample(self, rng):
+        return self._cells[rng.randrange(len(self._cells))]
+
+    def copy(self):
+        free = FreeCells(rows=self._rows)
+        free._cells = self._cells[:]
+        free._index = dict(self._index)
+        return free
 
 
 class Map:
+    """The map tiles, stored column by column in a padded uint8 buffer.
+
+    A one cell EDGE border surrounds the map, so positions one step off the
+    map are looked up without bounds checks. grid is a read-only NumPy view
+    of the tiles for vectorized queries and zero copy export, set_tile()
+    changes them.
+
+    Moves are precomputed per cell and direction, see calc_pos(), and free
+    cells are indexed for spawning. Tiles, moves and free cells are shared
+    with snapshots and copied before they change.
+    """
+
     def __init__(
         self,
         level=1,
         size=(100, 100),
         mushroom_percentage=0.1,  # TODO set to 0.1
         mapa=None,
+        rng=random,
     ):
+        self._rng = rng
         self._level = level
         self._size = size
+        self._stride = size[1] + 2
         self._stones = []
         self._mushrooms = []
-        self._queue_mushrooms = []
+        self._queue_mushrooms = deque()
         self._snake_nests = []
+        self._shared = False  # tiles and moves are referenced by a snapshot
+        self._map = None  # nested lists built by map, until a tile changes
 
         if not mapa:
             logger.info("Generating a MAP")
-            self.map = [[Tiles.PASSAGE] * self.ver_tiles for _ in range(self.hor_tiles)]
+            self._tiles = bytearray([EDGE]) * ((self.hor_tiles + 2) * self._stride)
+            self._view()[...] = Tiles.PASSAGE
+            self._reset_free()
 
             # add stones TODO if required more difficult levels
             """
             for _ in range(10):
-                x, y = random.randint(0, self.hor_tiles - 1), random.randint(
+                x, y = self._rng.randint(0, self.hor_tiles - 1), self._rng.randint(
                     0, self.ver_tiles - 1
                 )
                 wall_length = 5
                 for yy in range(
-                    y, (y + random.choice([-wall_length, wall_length])) % self.ver_tiles
+                    y, (y + self._rng.choice([-wall_length, wall_length])) % self.ver_tiles
                 )[:wall_length]:
-                    self.map[x][yy] = Tiles.STONE
+                    self._put(x, yy, Tiles.STONE)
                     self._stones.append((x, yy))
                 for xx in range(
-                    x, (x + random.choice([-wall_length, wall_length])) % self.hor_tiles
+                    x, (x + self._rng.choice([-wall_length, wall_length])) % self.hor_tiles
                 )[:wall_length]:
-                    self.map[xx][y] = Tiles.STONE
+                    self._put(xx, y, Tiles.STONE)
                     self._stones.append((xx, y))
             """
             # add mushrooms
-            while len(self._mushrooms) < (
+            while self._free and len(self._mushrooms) < (
                 self.hor_tiles * self.ver_tiles * mushroom_percentage
             ):  # 10% of map
-                x, y = random.randint(0, self.hor_tiles - 1), random.randint(
-                    0, self.ver_tiles - 1
-                )
-                if self.map[x][y] == Tiles.PASSAGE:
-                    self.map[x][y] = Tiles.FOOD
-                    self._mushrooms.append((x, y))
+                x, y = self._free.sample(self._rng)
+                self._put(x, y, Tiles.FOOD)
+                self._mushrooms.append((x, y))
 
             # queue some more mushrooms to be spawned later
             self.spawn_mushroom()
 
             # clean up bottom rows for bug blaster
-            for x in range(self.hor_tiles):
-                for y in range(self.ver_tiles - BOTTOM_ROWS, self.ver_tiles):
-                    if self.map[x][y] == Tiles.FOOD and (x, y) in self._mushrooms:
-                        self._mushrooms.remove((x, y))
-                    if self.map[x][y] == Tiles.STONE:
-                        self._stones.remove((x, y))
-                    self.map[x][y] = Tiles.PASSAGE
+            bottom = self.ver_tiles - BOTTOM_ROWS
+            self._mushrooms = [(x, y) for x, y in self._mushrooms if y < bottom]
+            self._stones = [(x, y) for x, y in self._stones if y < bottom]
+            for x, y in np.argwhere(self.grid[:, bottom:] != Tiles.PASSAGE).tolist():
+                self._put(x, y + bottom, Tiles.PASSAGE)
+            self._reset_moves()
 
         else:
             logger.info("Loading MAP")
             self.map = mapa
 
+    def _index(self, x, y):
+        return (x + 1) * self._stride + y + 1
+
+    def _put(self, x, y, tile):
+        """Set the tile at x, y, keeping the free cells up to date."""
+        self._tiles[(x + 1) * self._stride + y + 1] = tile
+        self._map = None
+        if tile == Tiles.PASSAGE:
+            self._free.add((x, y))
+            self._free_top.add((x, y))
+        else:
+            self._free.discard((x, y))
+            self._free_top.discard((x, y))
+
+    def _reset_free(self):
+        free = list(map(tuple, self.cells(Tiles.PASSAGE).tolist()))
+        self._free = FreeCells(free)
+        # where mushrooms spawn during the game
+        self._free_top = FreeCells(free, rows=range(self.ver_tiles - BOTTOM_ROWS + 1))
+
+    def _reset_moves(self):
+        stride = self._stride
+        cells = np.arange(len(self._tiles))
+        self._positions = list(
+            zip((cells // stride - 1).tolist(), (cells % stride - 1).tolist())
+        )
+        self._moves = [self._build_moves(traverse=False), None]
+
+    def _build_moves(self, traverse):
+        """Cell reached from every cell in each Direction, as position tuples."""
+        width, height = self.size
+        stride = self._stride
+        tiles = np.frombuffer(self._tiles, dtype=np.uint8)
+        cells = np.arange(len(tiles))
+        x, y = cells // stride - 1, cells % stride - 1
+        on_map = tiles != EDGE
+
+        moves = []
+        for direction in Direction:
+            dx, dy = STEPS[direction]
+            nx, ny = x + dx, y + dy
+            if traverse:  # wrap around
+                nx, ny = nx % width, ny % height
+            target = np.where(on_map, (nx + 1) * stride + ny + 1, cells)
+            blocked = tiles[target] == EDGE
+            if not traverse:
+                blocked |= tiles[target] == Tiles.STONE
+            target = np.where(blocked, cells, target)
+            moves.append([self._positions[i] for i in target.tolist()])
+        return moves
+
+    def _own(self):
+        """Stop sharing tiles and moves with snapshots, before changing them."""
+        if self._shared:
+            self._tiles = bytearray(self._tiles)
+            self._moves = [[list(m) for m in self._moves[0]], self._moves[1]]
+            self._free = self._free.copy()
+            self._free_top = self._free_top.copy()
+            self._shared = False
+
+    def _view(self):
+        """Writable (width, height) view of the tiles, bypassing set_tile()."""
+        return np.frombuffer(self._tiles, dtype=np.uint8).reshape(-1, self._stride)[
+            1:-1, 1:-1
+        ]
+
+    @property
+    def grid(self):
+        """Tiles as a read-only (width, height) uint8 array, sharing the map memory.
+
+        The tiles may be shared with snapshots and copies, change them with
+        set_tile() so that those, the moves and the free cells stay right.
+        """
+        view = self._view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def map(self):
+        """Tiles as nested lists, map[x][y], not to be changed.
+
+        Built from the tiles on the first access after a tile changed,
+        later accesses return the same lists.
+        """
+        if self._map is None:
+            self._map = self._view().tolist()
+        return self._map
+
+    @map.setter
+    def map(self, mapa):
+        self._size = (len(mapa), len(mapa[0]))
+        self._stride = self._size[1] + 2
+        self._tiles = bytearray([EDGE]) * ((self._size[0] + 2) * self._stride)
+        self._shared = False
+        self._map = None
+        self._view()[...] = mapa
+        self._reset_free()
+        self._reset_moves()
+
+    def set_tile(self, pos, tile):
+        """Change the tile at pos, updating the moves into pos."""
+        x, y = pos
+        self._own()
+        i = self._index(x, y)
+        blocks = tile == Tiles.STONE
+        changed = (self._tiles[i] == Tiles.STONE) != blocks
+        self._put(x, y, tile)
+        if changed:
+            moves = self._moves[False]
+            for direction, (dx, dy) in STEPS.items():
+                j = self._index(x - dx, y - dy)  # moves into pos going direction
+                if self._tiles[j] != EDGE:
+                    moves[direction][j] = self._positions[j if blocks else i]
+
+    def cells(self, tile):
+        """Positions of every cell holding tile, as an (n, 2) array."""
+        return np.argwhere(self.grid == tile)
+
     @property
     def mushrooms(self):
-        return [(x, y, self.map[x][y].name) for x, y in self._mushrooms]
+        return [
+            (x, y, Tiles(self._tiles[self._index(x, y)]).name)
+            for x, y in self._mushrooms
+        ]
 
     def spawn_mushroom(self):
-        if not self._queue_mushrooms or len(self._queue_mushrooms) == 0:
+        """Position of the next mushroom, None once the map is full."""
+        if not self._queue_mushrooms:
             logger.warning("No more mushrooms to spawn")
-            while len(self._queue_mushrooms) < (
+            self._own()
+            while self._free_top and len(self._queue_mushrooms) < (
                 self.hor_tiles * self.ver_tiles * 0.1
             ):  # generate packs corresponding to 10% of map
-                x, y = random.randint(0, self.hor_tiles - 1), random.randint(
-                    0, self.ver_tiles - BOTTOM_ROWS
-                )
-                if self.map[x][y] == Tiles.PASSAGE:
-                    self.map[x][y] = Tiles.FOOD
-                    self._queue_mushrooms.append((x, y))
-        return self._queue_mushrooms.pop(0)
+                x, y = self._free_top.sample(self._rng)
+                self._put(x, y, Tiles.FOOD)
+                self._queue_mushrooms.append((x, y))
+        if not self._queue_mushrooms:
+            logger.warning("Map is full, no mushroom to spawn")
+            return None
+        return self._queue_mushrooms.popleft()
+
+    def snapshot(self):
+        """State changed by spawn_mushroom() and set_tile().
+
+        Tiles, moves and free cells are not copied, the map copies them
+        before a change.
+        """
+        self._shared = True
+        return (
+            self._tiles,
+            self._moves[False],
+            self._free,
+            self._free_top,
+            tuple(self._queue_mushrooms),
+            self._rng.getstate(),
+        )
+
+    def restore(self, snapshot):
+        (
+            self._tiles,
+            self._moves[False],
+            self._free,
+            self._free_top,
+            queue,
+            rng_state,
+        ) = snapshot
+        self._shared = True
+        self._map = None
+        self._queue_mushrooms = deque(queue)
+        self._rng.setstate(rng_state)
+
+    def copy(self):
+        """Independent copy of the map, cheap whatever its size.
+
+        Tiles, moves and free cells are shared until either map changes them.
+        """
+        mapa = Map.__new__(Map)
+        mapa.__dict__.update(self.__dict__)
+        if isinstance(self._rng, random.Random):
+            mapa._rng = random.Random()
+            mapa._rng.setstate(self._rng.getstate())
+        mapa._queue_mushrooms = deque(self._queue_mushrooms)
+        mapa._moves = list(self._moves)
+        mapa._map = None
+        self._shared = mapa._shared = True
+        return mapa
 
     @property
     def hor_tiles(self):
@@ -123,55 +362,48 @@ class Map:
 
     def get_tile(self, pos: tuple[int, int]):
         x, y = pos
-        return self.map[x][y]
+        if not (0 <= x < self._size[0] and 0 <= y < self._size[1]):
+            raise IndexError(f"{pos} is off the map")
+        return Tiles(self._tiles[self._index(x, y)])
 
     def is_blocked(self, pos, traverse):
+        """Can pos not be entered, off the map the map wraps with traverse."""
         x, y = pos
-        if not traverse and (
-            x not in range(self.hor_tiles) or y not in range(self.ver_tiles)
-        ):
-            logger.debug("Crash against map edge(%s, %s)", x, y)
-            return True
-        if self.map[x][y] == Tiles.PASSAGE:
+        width, height = self._size
+        if not (0 <= x < width and 0 <= y < height):
+            if not traverse:
+                logger.debug("Crash against map edge(%s, %s)", x, y)
+                return True
+            x, y = x % width, y % height
+        tile = self._tiles[(x + 1) * self._stride + y + 1]
+        if tile == Tiles.PASSAGE or tile == Tiles.FOOD or tile == Tiles.SUPER:
             return False
-        if self.map[x][y] == Tiles.STONE:
+        if tile == Tiles.STONE:
             if traverse:
                 return False
             else:
                 logger.debug("Crash against Stone(%s, %s)", x, y)
                 return True
-        if self.map[x][y] in [Tiles.FOOD, Tiles.SUPER]:
-            return False
 
         assert False, "Unknown tile type"
 
     def calc_pos(self, cur, direction: Direction, traverse=False):
-        cx, cy = cur
-        npos = cur
-        if direction == Direction.NORTH:
-            if traverse and cy - 1 < 0:  # wrap around
-                npos = cx, self.ver_tiles - 1
-            else:
-                npos = cx, cy - 1
-        if direction == Direction.WEST:
-            if traverse and cx - 1 < 0:  # wrap around
-                npos = self.hor_tiles - 1, cy
-            else:
-                npos = cx - 1, cy
-        if direction == Direction.SOUTH:
-            if traverse and cy + 1 >= self.ver_tiles:  # wrap around
-                npos = cx, 0
-            else:
-                npos = cx, cy + 1
-        if direction == Direction.EAST:
-            if traverse and cx + 1 >= self.hor_tiles:  # wrap around
-                npos = 0, cy
-            else:
-                npos = cx + 1, cy
+        """Position reached from cur going direction, cur itself if blocked.
+
+        With traverse the map wraps around and stones do not block.
+        """
+        if (moves := self._moves[traverse]) is None:
+            moves = self._moves[traverse] = self._build_moves(traverse)
+        x, y = cur
+        return moves[direction][(x + 1) * self._stride + y + 1]
 
-        # test blocked
-        if self.is_blocked(npos, traverse):
-            logger.debug("%s is blocked", npos)
-            return cur
+    def transitions(self, traverse=False):
+        """calc_pos() of every cell, e.g. for path finding.
 
-        return npos
+        An int array of shape (width, height, 4, 2): the x, y reached from
+        each cell going each Direction.
+        """
+        self.calc_pos((0, 0), Direction.NORTH, traverse)  # build moves
+        moves = np.array(self._moves[traverse], dtype=np.int32)
+        moves = moves.reshape(len(Direction), -1, self._stride, 2)[:, 1:-1, 1:-1]
+        return moves.transpose(1, 2, 0, 3)
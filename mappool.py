@@ -0,0 +1,77 @@
+"""Maps generated ahead of time.
+
+Generating a map takes time proportional to its size. A MapPool generates
+the maps of upcoming seeds in a background thread and keeps them by
+(seed, size, mushroom_percentage, level); games get a copy, which is cheap
+whatever the map size:
+
+    maps = MapPool()
+    maps.prefetch(seed, size)
+    ...
+    await maps.wait(seed, size)  # from a coroutine, not to block the event loop
+    game = Game(seed=seed, size=size, maps=maps)
+"""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from game import generate_map
+
+logger = logging.getLogger("MapPool")
+logger.setLevel(logging.DEBUG)
+
+CAPACITY = 16  # maps kept, least recently used ones are dropped
+
+
+class MapPool:
+    def __init__(self, capacity=CAPACITY, workers=1):
+        self._capacity = capacity
+        self._maps = OrderedDict()  # key to Future of the map
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="MapPool"
+        )
+
+    def _future(self, key, background):
+        with self._lock:
+            future = self._maps.get(key)
+            if future is None:
+                if background:
+                    future = self._executor.submit(generate_map, *key)
+                else:
+                    future = Future()
+                self._maps[key] = future
+                while len(self._maps) > self._capacity:
+                    self._maps.popitem(last=False)
+            else:
+                self._maps.move_to_end(key)
+                background = True
+        if not background:
+            try:
+                future.set_result(generate_map(*key))
+            except Exception as err:
+                future.set_exception(err)
+        return future
+
+    def prefetch(self, seed, size, mushroom_percentage=0.1, level=1):
+        """Start generating a map that will be asked for soon."""
+        self._future((seed, tuple(size), mushroom_percentage, level), True)
+
+    async def wait(self, seed, size, mushroom_percentage=0.1, level=1):
+        """Wait for the map to be generated, in the background."""
+        future = self._future((seed, tuple(size), mushroom_percentage, level), True)
+        await asyncio.wrap_future(future)
+
+    def get(self, seed, size, mushroom_percentage=0.1, level=1):
+        """Copy of the map, waiting for it or generating it if needed."""
+        future = self._future((seed, tuple(size), mushroom_percentage, level), False)
+        return future.result().copy()
+
+    def __len__(self):
+        return len(self._maps)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
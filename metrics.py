@@ -0,0 +1,105 @@
+"""Runtime metrics in the Prometheus text format.
+
+The server answers GET /metrics on its websocket port with
+Registry.render(); point a Prometheus scrape job at it.
+"""
+
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = (
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, registry, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}  # sorted label pairs to value
+        registry.register(self)
+
+    def samples(self):
+        """(name, labels, value) of every sample to expose."""
+        for labels, value in self._values.items():
+            yield self.name, labels, value
+
+    def clear(self, **labels):
+        """Drop the samples of a label set, e.g. of a room no longer playing."""
+        self._values.pop(tuple(sorted(labels.items())), None)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, registry, name, help, function=None):
+        super().__init__(registry, name, help)
+        self._function = function  # returns the value, read at every scrape
+
+    def set(self, value, **labels):
+        self._values[tuple(sorted(labels.items()))] = value
+
+    def samples(self):
+        if self._function is not None:
+            yield self.name, (), self._function()
+        yield from super().samples()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, buckets):
+        super().__init__(registry, name, help)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        if (entry := self._values.get(key)) is None:
+            entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += 1
+        entry[2] += value
+
+    def samples(self):
+        for labels, (counts, count, total) in self._values.items():
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield self.name + "_bucket", labels + (("le", le),), cumulative
+            yield self.name + "_count", labels, count
+            yield self.name + "_sum", labels, total
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,77 @@
+"""Latest frame outboxes, so that a slow client never holds the game back.
+
+Every client gets an Outbox with a writer task of its own. The game posts
+to it without waiting and the writer sends in the background, in order. A
+frame posted while the previous one is still waiting replaces it: a slow
+client skips to the latest frame and holds at most one of them.
+"""
+
+import asyncio
+from collections import deque
+
+
+class Outbox:
+    """Messages waiting to be sent to a client."""
+
+    def __init__(self, send):
+        self._send = send  # coroutine function, False once the client is gone
+        self._queue = deque()  # (payload, frame) not sent yet
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.dropped = 0  # frames replaced before being sent
+        self.closed = False  # no more messages are sent
+        self._task = asyncio.ensure_future(self._write())
+
+    def __len__(self):
+        return len(self._queue)
+
+    @property
+    def frame_pending(self):
+        """Whether the next frame posted replaces one not sent yet."""
+        return bool(self._queue) and self._queue[-1][1]
+
+    def post(self, payload, frame=True):
+        """Queue payload, returns True if it replaced a frame not sent yet.
+
+        Messages that are not frames, e.g. game info, are all sent.
+        """
+        if self.closed:
+            return False
+        replaced = frame and self.frame_pending
+        if replaced:
+            self._queue[-1] = (payload, frame)
+            self.dropped += 1
+        else:
+            self._queue.append((payload, frame))
+        self._idle.clear()
+        self._wakeup.set()
+        return replaced
+
+    async def _write(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._queue:
+                payload, _ = self._queue.popleft()
+                if not await self._send(payload):
+                    self.closed = True
+                    self._queue.clear()
+                    self._idle.set()
+                    return
+            self._idle.set()
+
+    async def drain(self, timeout=None):
+        """Wait for everything posted to be sent, returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def close(self):
+        """Stop sending, messages not sent yet are dropped."""
+        self.closed = True
+        self._queue.clear()
+        self._idle.set()
+        self._task.cancel()
@@ -0,0 +1,118 @@
+"""Per phase timing of game ticks.
+
+Set Game.profiler to a TickProfiler to time every phase of Game.step():
+
+    game.profiler = TickProfiler()
+    ...
+    game.profiler.histograms()["collision"]  # {bucket upper bound ms: ticks}
+    game.profiler.dump("ticks.trace.json")  # open in Perfetto or chrome://tracing
+
+With no profiler set, a tick only pays a few `is not None` checks.
+"""
+
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import deque
+
+from game import GAME_SPEED
+
+logger = logging.getLogger("Profiler")
+logger.setLevel(logging.DEBUG)
+
+TICKS = 1000  # ticks kept for the trace
+BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 50, 100, float("inf"))  # ms
+TICK = "tick"  # the whole tick, alongside the phases
+
+
+class TickProfiler:
+    """Times the phases of the last ticks and keeps histograms of all ticks."""
+
+    def __init__(self, ticks=TICKS, budget=1.0 / GAME_SPEED):
+        self._ticks = deque(maxlen=ticks)  # (tick, start ns, [(phase, ns)])
+        self._budget_ns = budget * 1e9
+        self._counts = {}  # phase to count per bucket
+        self.overruns = []  # ticks longer than the budget
+        self._tick = None
+        self._start = self._last = 0
+        self._phases = []
+
+    def start(self, tick):
+        self._tick = tick
+        self._phases = []
+        self._start = self._last = time.perf_counter_ns()
+
+    def lap(self, phase):
+        """End phase, the next one starts now."""
+        now = time.perf_counter_ns()
+        self._phases.append((phase, now - self._last))
+        self._last = now
+
+    def end(self):
+        total = self._last - self._start
+        self._ticks.append((self._tick, self._start, self._phases))
+
+        per_phase = {TICK: total}
+        for phase, duration in self._phases:
+            per_phase[phase] = per_phase.get(phase, 0) + duration
+        for phase, duration in per_phase.items():
+            if (counts := self._counts.get(phase)) is None:
+                counts = self._counts[phase] = [0] * len(BUCKETS)
+            counts[bisect_left(BUCKETS, duration / 1e6)] += 1
+
+        if total > self._budget_ns:
+            self.overruns.append(self._tick)
+            logger.warning(
+                "Tick %s took %.1f ms, over the %.1f ms budget",
+                self._tick,
+                total / 1e6,
+                self._budget_ns / 1e6,
+            )
+
+    def histograms(self):
+        """Ticks per duration bucket of every phase, by bucket upper bound in ms.
+
+        A phase run twice in a tick counts once, with both durations added.
+        """
+        return {
+            phase: dict(zip(BUCKETS, counts)) for phase, counts in self._counts.items()
+        }
+
+    def trace(self):
+        """Chrome trace events of the ticks kept."""
+        pid = os.getpid()
+        events = []
+        for tick, start, phases in self._ticks:
+            at = start
+            for phase, duration in phases:
+                events.append(
+                    {
+                        "name": phase,
+                        "ph": "X",
+                        "ts": at / 1e3,
+                        "dur": duration / 1e3,
+                        "pid": pid,
+                        "tid": 1,
+                        "args": {"tick": tick},
+                    }
+                )
+                at += duration
+            events.append(
+                {
+                    "name": TICK,
+                    "ph": "X",
+                    "ts": start / 1e3,
+                    "dur": (at - start) / 1e3,
+                    "pid": pid,
+                    "tid": 0,
+                    "args": {"tick": tick, "overrun": at - start > self._budget_ns},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path):
+        """Write the trace of the ticks kept, for Perfetto or chrome://tracing."""
+        with open(path, "w") as outfile:
+            json.dump(self.trace(), outfile)
@@ -0,0 +1,105 @@
+"""Compact game replays: the seed, the map parameters and one byte per frame.
+
+A replay is re-simulated through Game at full speed, which reproduces the
+game exactly since every random draw derives from the seed.
+
+    python3 replay.py replays/*.replay
+"""
+import argparse
+import logging
+import struct
+import sys
+import zlib
+
+from game import Game, code2key
+
+logger = logging.getLogger("Replay")
+logger.setLevel(logging.INFO)
+
+MAGIC = b"CRPL"
+VERSION = 2  # bumped whenever a seed stops generating the same game
+# magic, version, seed, width, height, timeout, level, score, frames
+HEADER = struct.Struct("<4sBQHHIHqI")
+
+
+def save(path, game):
+    """Write the replay of game to path."""
+    width, height = game.map.size
+    inputs = game.inputs
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        game.seed,
+        width,
+        height,
+        game._timeout,
+        game.initial_level,
+        game.score,
+        len(inputs),
+    )
+    with open(path, "wb") as outfile:
+        outfile.write(header + zlib.compress(inputs, 9))
+
+
+def load(path):
+    """Read a replay, returns its header fields and the per frame key codes."""
+    with open(path, "rb") as infile:
+        data = infile.read()
+    magic, version, *fields = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} replay")
+    seed, width, height, timeout, level, score, frames = fields
+    header = {
+        "seed": seed,
+        "size": (width, height),
+        "timeout": timeout,
+        "level": level,
+        "score": score,
+        "frames": frames,
+    }
+    return header, zlib.decompress(data[HEADER.size :])
+
+
+def simulate(header, inputs):
+    """Play the recorded inputs again, returns the finished Game."""
+    game = Game(
+        level=header["level"],
+        timeout=header["timeout"],
+        size=header["size"],
+        seed=header["seed"],
+    )
+    game.start(["replay"])
+    for code in inputs:
+        game.step(code2key(code))
+    return game
+
+
+def verify(path):
+    """Re-simulate the replay at path, True if it ends with the same score."""
+    header, inputs = load(path)
+    game = simulate(header, inputs)
+    if game.score != header["score"] or game._step != header["frames"]:
+        logger.error(
+            "%s: recorded score %s in %s frames, replayed %s in %s frames",
+            path,
+            header["score"],
+            header["frames"],
+            game.score,
+            game._step,
+        )
+        return False
+    logger.info("%s: score %s verified", path, game.score)
+    return True
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("Game").setLevel(logging.WARNING)
+    logging.getLogger("Map").setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("replays", nargs="+", help="Replay files to verify")
+    args = parser.parse_args()
+
+    results = [verify(path) for path in args.replays]
+    sys.exit(0 if all(results) else 1)
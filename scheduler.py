@@ -0,0 +1,70 @@
+"""Fixed timestep pacing of game ticks.
+
+Tick n is due at start + n * period on the monotonic clock, whatever the tick
+and the sends before it took, so the tick rate does not drift below the game
+speed. When a tick is already late the ticks missed are caught up according
+to the policy:
+
+    SKIP   run one tick and drop the missed ones, the game slows down
+    BURST  run the missed ticks back to back, up to max_burst at once
+
+    scheduler = TickScheduler(GAME_SPEED)
+    while game.running:
+        for _ in range(await scheduler.wait()):
+            game.step()
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("Scheduler")
+logger.setLevel(logging.DEBUG)
+
+SKIP = "skip"
+BURST = "burst"
+POLICIES = (SKIP, BURST)
+MAX_BURST = 5  # ticks run back to back at most when catching up
+
+
+class TickScheduler:
+    """Paces ticks against absolute deadlines, counting the late ones."""
+
+    def __init__(self, rate, policy=SKIP, max_burst=MAX_BURST, clock=time.monotonic):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown catch up policy {policy}, use one of {POLICIES}")
+        self.period = 1.0 / rate
+        self.policy = policy
+        self.max_burst = max_burst if policy == BURST else 1
+        self._clock = clock
+        self._deadline = None  # when the next tick is due
+        self.ticks = 0  # ticks run
+        self.overruns = 0  # waits that found their tick already late
+        self.skipped = 0  # ticks dropped to catch up
+
+    def reset(self):
+        """Start over, the next tick is due a period from now."""
+        self._deadline = None
+
+    async def wait(self):
+        """Sleep until the next tick is due, returns how many ticks to run now."""
+        now = self._clock()
+        if self._deadline is None:
+            self._deadline = now + self.period
+
+        if now < self._deadline:
+            await asyncio.sleep(self._deadline - now)
+            self._deadline += self.period
+            self.ticks += 1
+            return 1
+
+        late = now - self._deadline
+        missed = int(late // self.period) + 1
+        due = min(missed, self.max_burst)
+        self.overruns += 1
+        self.skipped += missed - due
+        self._deadline += missed * self.period
+        self.ticks += due
+        logger.debug("Tick %.1f ms late, running %s of %s due", late * 1e3, due, missed)
+        await asyncio.sleep(0)  # still let clients in between late ticks
+        return due
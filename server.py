@@ -1,4 +1,5 @@
 """Network Game Server."""
+
 from __future__ import annotations
 import argparse
 import asyncio
@@ -7,7 +8,10 @@ import json
 import logging
 import os.path
 import random
-from collections import namedtuple
+import re
+import time
+from collections import deque, namedtuple
+from http import HTTPStatus
 from typing import Set
 
 import requests
@@ -15,8 +19,17 @@ import websockets
 from requests import RequestException
 from websockets.legacy.protocol import WebSocketCommonProtocol
 
-from game import Game
+from game import Game, GAME_SPEED, MAP_SIZE
+from mappool import CAPACITY, MapPool
+from profiler import TickProfiler
+from codec import get_codec
 from consts import TIMEOUT
+from delta import DeltaEncoder, KEYFRAME_INTERVAL
+import replay
+from archive import ArchiveWriter
+from scheduler import POLICIES, SKIP, TickScheduler
+from outbox import Outbox
+from metrics import CONTENT_TYPE, Counter, Gauge, Histogram, Registry
 
 logging.basicConfig(
     level=logging.DEBUG, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -31,6 +44,66 @@ Player = namedtuple("Player", ["name", "ws"])
 
 HIGHSCORE_FILE = "highscores.json"
 MAX_HIGHSCORES = 10
+DEFAULT_ROOM = 1
+DRAIN_TIMEOUT = 1.0  # seconds given to clients to get the game over message
+LOCKSTEP_TIMEOUT = 0.1  # seconds a lockstep room waits for keys before stepping
+METRICS_PATH = "/metrics"
+TICK_RATE_WINDOW = 2.0  # seconds of ticks the achieved tick rate is measured over
+SECONDS_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144)
+
+
+class Room:
+    """A table of the server, hosting its games one after the other."""
+
+    def __init__(self, room_id: int, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.id = room_id
+        self.game = None
+        self.players: list[Player] = []
+        self.viewers: Set[WebSocketCommonProtocol] = set()
+        self.delta = DeltaEncoder(keyframe_interval)
+        self.tick_times = deque()  # perf_counter() of the ticks in TICK_RATE_WINDOW
+        self.lockstep = False  # step once every player answered the last frame
+        self.waiting = set()  # players yet to answer the last frame
+        self.keys = {}  # key each player answered the last frame with
+        self.step = None  # game step of the last frame
+        self.turn = asyncio.Event()  # set once no player is waiting
+
+    @property
+    def running(self):
+        return self.game is not None and self.game.running
+
+    def open_turn(self, clients, step=0):
+        """Wait for the keys of clients, that were just sent the frame of step."""
+        self.waiting = set(clients)
+        self.keys = {}
+        self.step = step
+        if self.waiting:
+            self.turn.clear()
+        else:
+            self.turn.set()
+
+    def answered(self, client, key, step=None):
+        """Keep the key of client for the turn, the last one it sent.
+
+        An answer stamped with the step of an older frame came after its turn
+        ended and is dropped. Returns whether the key was kept.
+        """
+        if step is not None and step != self.step:
+            return False
+        if client not in self.waiting and client not in self.keys:
+            return False  # not playing this turn
+        self.keys[client] = key
+        self.waiting.discard(client)
+        if not self.waiting:
+            self.turn.set()
+        return True
+
+    def turn_keys(self):
+        """Key of every player for the turn, no key for those not answering."""
+        keys = dict.fromkeys(self.waiting, "")
+        keys.update(self.keys)  # answered keys are pressed last
+        return keys
 
 
 class GameServer:
@@ -44,36 +117,168 @@ class GameServer:
         players=1,
         grading: str = None,
         dbg: bool = False,
+        keyframe_interval: int = KEYFRAME_INTERVAL,
+        rooms: int = 1,
+        replays: str = None,
+        archive: bool = False,
+        profile: bool = False,
+        game_speed: int = GAME_SPEED,
+        catch_up: str = SKIP,
+        lockstep: bool = False,
     ):
         """Initialize Gameserver."""
         self.dbg = dbg
+        self.game_speed = game_speed  # ticks per second
+        self.catch_up = catch_up  # TickScheduler policy for late ticks
+        self.lockstep = lockstep  # every room steps on the keys of its players
         self.seed = seed
-        self.game = Game(timeout=timeout)
         self.players: asyncio.Queue[Player] = asyncio.Queue()
-        self.viewers: Set[WebSocketCommonProtocol] = set()
+        self.rooms = {
+            room_id: Room(room_id, keyframe_interval)
+            for room_id in range(DEFAULT_ROOM, DEFAULT_ROOM + rooms)
+        }
+        self.free_rooms: asyncio.Queue[Room] = asyncio.Queue()
+        for room in self.rooms.values():
+            self.free_rooms.put_nowait(room)
+        self.player_room = {}  # websocket to room mapping
+        self._room_tasks = set()
         self.grading = grading
+        self.replays = replays  # directory where games are recorded
+        self.archive = archive  # also archive every frame to replays
+        self.profile = profile  # also trace the ticks of every game to replays
         self._level = level  # game level
         self._timeout = timeout  # timeout for game
         self.game_player = {}  # websocket to player mapping
         self.number_of_players = players
+        self.delta_clients: Set[WebSocketCommonProtocol] = set()
+        self._keyframe_pending: Set[WebSocketCommonProtocol] = set()
+        self.codecs = {}  # websocket to codec mapping, JSON when missing
+        self.outboxes = {}  # websocket to Outbox mapping
+        self.lockstep_clients: Set[WebSocketCommonProtocol] = set()
+        self.maps = MapPool(max(CAPACITY, 2 * rooms))
+        self._next_seeds = deque()
+        for _ in range(rooms):  # have a map generated per room while players join
+            self._next_seeds.append(self._new_seed())
+        self._init_metrics()
 
         self._highscores = []
         if os.path.isfile(HIGHSCORE_FILE):
             with open(HIGHSCORE_FILE, "r") as infile:
                 self._highscores = json.load(infile)
 
-    def save_highscores(self):
-        """Update highscores, storing to file."""
+    def _init_metrics(self):
+        """Metrics served at METRICS_PATH, see process_request."""
+        self.metrics = Registry()
+        self.ticks = Counter(self.metrics, "centipede_ticks_total", "Ticks played")
+        self.tick_seconds = Histogram(
+            self.metrics,
+            "centipede_tick_seconds",
+            "Time spent computing a tick",
+            SECONDS_BUCKETS,
+        )
+        self.tick_rate = Gauge(
+            self.metrics, "centipede_tick_rate", "Ticks per second achieved"
+        )
+        Gauge(
+            self.metrics,
+            "centipede_tick_rate_target",
+            "Ticks per second aimed at",
+            lambda: self.game_speed,
+        )
+        self.tick_overruns = Counter(
+            self.metrics,
+            "centipede_tick_overruns_total",
+            "Ticks started after their deadline",
+        )
+        self.turn_timeouts = Counter(
+            self.metrics,
+            "centipede_turn_timeouts_total",
+            "Lockstep ticks played without the keys of every player",
+        )
+        self.ticks_skipped = Counter(
+            self.metrics,
+            "centipede_ticks_skipped_total",
+            "Ticks dropped to catch up with the clock",
+        )
+        self.send_seconds = Histogram(
+            self.metrics,
+            "centipede_send_seconds",
+            "Time to hand a frame to a client",
+            SECONDS_BUCKETS,
+        )
+        self.frames_dropped = Counter(
+            self.metrics,
+            "centipede_frames_dropped_total",
+            "Frames replaced by a newer one before being sent to a slow client",
+        )
+        self.sent_bytes = Counter(
+            self.metrics, "centipede_sent_bytes_total", "Bytes of frames sent"
+        )
+        self.frame_bytes = Histogram(
+            self.metrics,
+            "centipede_frame_bytes",
+            "Bytes of a frame sent to the players or viewers of a room",
+            BYTES_BUCKETS,
+        )
+        Gauge(
+            self.metrics,
+            "centipede_waiting_players",
+            "Players queued for a room",
+            self.players.qsize,
+        )
+        Gauge(
+            self.metrics,
+            "centipede_players",
+            "Connected players",
+            lambda: len(self.game_player),
+        )
+        Gauge(
+            self.metrics,
+            "centipede_viewers",
+            "Connected viewers",
+            lambda: sum(len(room.viewers) for room in self.rooms.values()),
+        )
+
+    def record_tick(self, room, started):
+        """Update the tick metrics of room, for a tick computed from started.
+
+        The tick rate counts the ticks of the last TICK_RATE_WINDOW seconds,
+        so ticks run back to back to catch up do not make it spike. It is
+        reported once ticks span half the window.
+        """
+        now = time.perf_counter()
+        self.ticks.inc(room=room.id)
+        self.tick_seconds.observe(now - started, room=room.id)
+        times = room.tick_times
+        times.append(started)
+        while started - times[0] > TICK_RATE_WINDOW:
+            times.popleft()
+        span = started - times[0]
+        if span >= TICK_RATE_WINDOW / 2:
+            self.tick_rate.set(round((len(times) - 1) / span, 3), room=room.id)
+
+    async def process_request(self, path, request_headers):
+        """Answer plain HTTP requests for the metrics, let websockets through."""
+        if path == METRICS_PATH:
+            return (
+                HTTPStatus.OK,
+                [("Content-Type", CONTENT_TYPE)],
+                self.metrics.render().encode(),
+            )
+        return None
+
+    def save_highscores(self, room):
+        """Update highscores with the game in room, storing to file."""
 
-        logger.debug("Save highscores")
-        for player in self.game_player.values():
+        logger.debug("Save highscores of room %s", room.id)
+        for player in room.players:
             logger.info(
                 "Saving: %s <%s>",
-                player,
-                self.game.score,
+                player.name,
+                room.game.score,
             )
 
-            self._highscores.append((player, self.game.score))
+            self._highscores.append((player.name, room.game.score))
             self._highscores = sorted(
                 self._highscores, key=lambda s: s[1], reverse=True
             )[:MAX_HIGHSCORES]
@@ -83,26 +288,154 @@ class GameServer:
 
         return self._highscores
 
-    async def send_clients(self, group, info):
-        to_remove = []
+    def record_path(self, room, extension):
+        """Path in the replays directory for a recording of room's game."""
+        names = "-".join(re.sub(r"\W", "_", p.name) for p in room.players)
+        return os.path.join(
+            self.replays,
+            f"{datetime.now():%Y%m%d-%H%M%S}-room{room.id}-{names}.{extension}",
+        )
 
-        original_group = group
-        if isinstance(group, dict):
-            group = list(group.keys())
-        else:
-            group = list(group)
+    def save_replay(self, room):
+        """Record the game played in room to the replays directory."""
+        path = self.record_path(room, "replay")
+        try:
+            os.makedirs(self.replays, exist_ok=True)
+            replay.save(path, room.game)
+            logger.info("Game recorded to %s", path)
+        except OSError as err:
+            logger.error("Could not record game: %s", err)
+
+    def open_archive(self, room):
+        """Archive every frame of the game in room to the replays directory."""
+        path = self.record_path(room, "frames")
+        try:
+            os.makedirs(self.replays, exist_ok=True)
+            room.game.archive = ArchiveWriter(path, room.game.map.size)
+            logger.info("Archiving frames to %s", path)
+        except OSError as err:
+            logger.error("Could not archive game: %s", err)
+
+    def _new_seed(self):
+        """Pick a seed for a game to come, its map is prefetched."""
+        seed = self.seed if self.seed > 0 else random.getrandbits(64)
+        self.maps.prefetch(seed, MAP_SIZE)
+        return seed
+
+    def next_seed(self):
+        """Seed of the next game, one map per room is kept prefetched."""
+        self._next_seeds.append(self._new_seed())
+        return self._next_seeds.popleft()
+
+    def save_trace(self, room):
+        """Dump the trace of the last ticks of room's game to the replays."""
+        profiler = room.game.profiler
+        path = self.record_path(room, "trace.json")
+        try:
+            os.makedirs(self.replays, exist_ok=True)
+            profiler.dump(path)
+            logger.info(
+                "Tick trace written to %s, %s ticks over budget",
+                path,
+                len(profiler.overruns),
+            )
+        except OSError as err:
+            logger.error("Could not write tick trace: %s", err)
+
+    def variant_for(self, client, delta):
+        """Which message of a frame client gets: state, keyframe or delta."""
+        if delta is None or client not in self.delta_clients:
+            return "state"
+        if client in self._keyframe_pending:
+            self._keyframe_pending.discard(client)
+            return "keyframe"
+        return "delta"
+
+    def encode_for(self, client, message):
+        """Serialize message with the codec client joined with."""
+        return self.codecs.get(client, get_codec()).encode(message)
+
+    def forget(self, client):
+        self.delta_clients.discard(client)
+        self._keyframe_pending.discard(client)
+        self.codecs.pop(client, None)
+        self.lockstep_clients.discard(client)
+        if (outbox := self.outboxes.pop(client, None)) is not None:
+            outbox.close()
+
+    def outbox(self, client):
+        """Outbox of client, created with its writer task on first call."""
+        if (outbox := self.outboxes.get(client)) is None:
+            outbox = self.outboxes[client] = Outbox(
+                lambda payload: self._send(client, payload)
+            )
+        return outbox
 
-        for client in group:
-            try:
-                await client.send(json.dumps(info))
-            except Exception:
-                logger.error("Could not send %s to client %s, removing", info, client)
-                to_remove.append(client)
+    async def _send(self, client, payload):
+        """Send payload to client, returns False if the client is gone."""
+        started = time.perf_counter()
+        try:
+            await client.send(payload)
+        except Exception:
+            logger.error("Could not send to client %s", client)
+            return False
+        self.send_seconds.observe(
+            time.perf_counter() - started,
+            client=self.game_player.get(client, "viewer"),
+        )
+        return True
+
+    def broadcast(self, clients, info, delta=None, stamp=False, room=None):
+        """Post info to the outboxes of all clients, returns those gone.
+
+        Every distinct (message, codec) pair is encoded a single time, with
+        stamp the post time is attached to each copy as "ts". Bytes posted
+        are counted as a frame of room, if given.
+
+        With delta, info is a frame and replaces the frame a slow client has
+        not been sent yet. A delta client then gets a keyframe instead, the
+        delta would not apply to the frame it has.
+        """
+        clients = list(clients)
+        messages = {"state": info, "delta": delta}
+        encoded = {}
+        gone = []
+        size = 0
+        frame = delta is not None
+        for client in clients:
+            outbox = self.outboxes.get(client)
+            if outbox is None or outbox.closed:
+                gone.append(client)
+                continue
+            if frame and outbox.frame_pending and client in self.delta_clients:
+                self._keyframe_pending.add(client)
+            variant = self.variant_for(client, delta)
+            codec = self.codecs.get(client, get_codec())
+            if (variant, codec.name) not in encoded:
+                if variant not in messages:
+                    messages[variant] = DeltaEncoder.keyframe(info)
+                encoded[variant, codec.name] = codec.encode(messages[variant])
+            payload = encoded[variant, codec.name]
+            if stamp:
+                payload = codec.attach(payload, {"ts": datetime.now().isoformat()})
+            if outbox.post(payload, frame):
+                self.frames_dropped.inc(client=self.game_player.get(client, "viewer"))
+            size += len(payload)
+
+        if room is not None and clients:
+            self.sent_bytes.inc(size, room=room.id)
+            self.frame_bytes.observe(size, room=room.id)
+        return gone
+
+    async def send_clients(self, group, info, delta=None, room=None):
+        to_remove = self.broadcast(group, info, delta, room=room)
         for client in to_remove:
-            if isinstance(original_group, dict):
-                del original_group[client]
+            logger.error("Removing client %s", client)
+            if isinstance(group, dict):
+                group.pop(client, None)
             else:
-                original_group.discard(client)
+                group.discard(client)
+            self.forget(client)
             await client.close()
 
     async def incomming_handler(self, websocket: WebSocketCommonProtocol, path: str):
@@ -113,6 +446,14 @@ class GameServer:
                 if "cmd" not in data:
                     continue
                 if data["cmd"] == "join":
+                    self.codecs[websocket] = get_codec(data.get("codec"))
+                    if data.get("delta"):
+                        self.delta_clients.add(websocket)
+                        self._keyframe_pending.add(websocket)
+                    if data.get("lockstep"):
+                        self.lockstep_clients.add(websocket)
+
+                    self.outbox(websocket)
                     if path == "/player":
                         if data["name"] in self.game_player.values():
                             logger.error("Player <%s> already exists", data["name"])
@@ -123,97 +464,209 @@ class GameServer:
                         self.game_player[websocket] = data["name"]
 
                     if path == "/viewer":
-                        logger.info("Viewer connected")
-                        self.viewers.add(websocket)
+                        room = self.rooms.get(data.get("room", DEFAULT_ROOM))
+                        if room is None:
+                            logger.error("Viewer asked for unknown room %s", data)
+                            await websocket.close()
+                            continue
+                        logger.info("Viewer connected to room %s", room.id)
+                        room.viewers.add(websocket)
 
-                    if self.game.running:
-                        game_info = self.game.info()
-                        await websocket.send(json.dumps(game_info))
+                        if room.running:
+                            game_info = room.game.info()
+                            self.outbox(websocket).post(
+                                self.encode_for(websocket, game_info), frame=False
+                            )
 
                 if data["cmd"] == "key":
-                    logger.debug((self.game_player[websocket], data))
-                    if len(data["key"]) > 0:
-                        self.game.keypress(self.game_player[websocket], data["key"][0])
-                    else:
-                        self.game.keypress(self.game_player[websocket], "")
+                    logger.debug((self.game_player.get(websocket), data))
+                    room = self.player_room.get(websocket)
+                    if room is None or not room.running:
+                        continue
+                    key = data["key"][0] if len(data["key"]) > 0 else ""
+                    if not room.lockstep:
+                        room.game.keypress(self.game_player[websocket], key)
+                    elif not room.answered(websocket, key, data.get("step")):
+                        logger.debug("Dropped key of an ended turn %s", data)
 
         except websockets.exceptions.ConnectionClosed as closed_reason:
             logger.info("Client disconnected: %s", closed_reason)
-            if websocket in self.viewers:
-                self.viewers.remove(websocket)
+        finally:
+            for room in self.rooms.values():
+                room.viewers.discard(websocket)
+            self.forget(websocket)
 
     async def mainloop(self):
-        """Run the game."""
+        """Seat waiting players at free rooms, all rooms play concurrently."""
         while True:
+            room = await self.free_rooms.get()
             game_players = []
-            logger.info("Waiting for players")
+            logger.info("Waiting for players for room %s", room.id)
             while len(game_players) < self.number_of_players:
-                game_players.append(await self.players.get())
+                player = await self.players.get()
 
-                if game_players[-1].ws.closed:
-                    logger.error("<%s> disconnect while waiting", game_players[-1].name)
+                if player.ws.closed:
+                    logger.error("<%s> disconnect while waiting", player.name)
+                    self.game_player.pop(player.ws, None)
                     continue
+                game_players.append(player)
+
+            task = asyncio.ensure_future(self.play(room, game_players))
+            self._room_tasks.add(task)
+            task.add_done_callback(self._room_tasks.discard)
 
+    async def ticks_due(self, room, scheduler):
+        """Wait for the next tick of room, returns how many ticks to play.
+
+        A lockstep room plays as soon as every player answered the last frame
+        with a key, or LOCKSTEP_TIMEOUT after it with no key for those that did
+        not answer, other rooms follow the clock.
+        """
+        if room.lockstep:
             try:
-                logger.info("Starting game")
-                if self.seed > 0:
-                    random.seed(self.seed)
-
-                self.game = Game(timeout=self._timeout)
-                self.game.start([p.name for p in game_players])
-
-                while self.game.running:
-                    if self.game._step == 0:  # Starting a level ? Let's send the info
-                        game_info = self.game.info()
-
-                        print("send viewers")
-                        await self.send_clients(self.viewers, game_info)
-                        print("send players")
-                        await self.send_clients(self.game_player, game_info)
-
-                    if state := await self.game.next_frame():
-                        await self.send_clients(self.viewers, state)
-
-                        for player in game_players:
-                            state["ts"] = datetime.now().isoformat()
-                            try:
-                                await player.ws.send(json.dumps(state))
-                            except Exception:
-                                logger.error(
-                                    "Player <%s> disconnected, could not send state",
-                                    player.name,
-                                )
-                                game_players.remove(player)
-
-                game_over = {"highscores": self.save_highscores()}
-                await self.send_clients(self.viewers, game_over)
-                await self.send_clients(self.game_player, game_over)
-
-                for ws, player in self.game_player.items():
-                    await ws.close()
-                self.game_player = {}
-
-            except websockets.exceptions.ConnectionClosed as ws_closed:
-                if ws_closed in self.game_player:
-                    self.game_player.pop(ws_closed)
-                logger.error("Player disconnected: %s", ws_closed)
+                await asyncio.wait_for(room.turn.wait(), LOCKSTEP_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.turn_timeouts.inc(room=room.id)
+            for client, key in room.turn_keys().items():
+                room.game.keypress(self.game_player.get(client), key)
+            return 1
+
+        overruns, skipped = scheduler.overruns, scheduler.skipped
+        ticks = await scheduler.wait()
+        self.tick_overruns.inc(scheduler.overruns - overruns, room=room.id)
+        self.ticks_skipped.inc(scheduler.skipped - skipped, room=room.id)
+        return ticks
+
+    async def play(self, room, game_players):
+        """Run a game in room, then hand the room back to the lobby."""
+        room.players = game_players
+        connected = list(game_players)
+        for player in game_players:
+            self.player_room[player.ws] = room
+
+        try:
+            logger.info("Starting game in room %s", room.id)
+            room.game = None
+            seed = self.next_seed()
+            await self.maps.wait(seed, MAP_SIZE)  # other rooms play meanwhile
+            room.game = Game(
+                timeout=self._timeout,
+                game_speed=self.game_speed,
+                seed=seed,
+                maps=self.maps,
+            )
+            scheduler = TickScheduler(self.game_speed, self.catch_up)
+            room.lockstep = self.lockstep or all(
+                player.ws in self.lockstep_clients for player in game_players
+            )
+            if room.lockstep:
+                logger.info("Room %s steps on the keys of its players", room.id)
+            room.game.start([p.name for p in game_players])
+            room.delta.reset()
+            if self.archive and self.replays:
+                self.open_archive(room)
+            if self.profile:
+                room.game.profiler = TickProfiler(budget=1.0 / self.game_speed)
+
+            while room.game.running:
+                if room.game._step == 0:  # Starting a level ? Let's send the info
+                    game_info = room.game.info()
+                    gone = self.broadcast([p.ws for p in connected], game_info)
+                    room.open_turn(
+                        (p.ws for p in connected if p.ws not in gone),
+                        room.game._step,
+                    )
+                    await self.send_clients(room.viewers, game_info)
+
+                state = None
+                for _ in range(await self.ticks_due(room, scheduler)):
+                    started = time.perf_counter()
+                    if tick := room.game.step():
+                        self.record_tick(room, started)
+                        state = tick
+
+                if state:  # the last of a burst, deltas are against the last sent
+                    delta = room.delta.encode(state)
+                    gone = self.broadcast(
+                        [player.ws for player in connected],
+                        state,
+                        delta,
+                        stamp=True,
+                        room=room,
+                    )
+                    room.open_turn(
+                        (p.ws for p in connected if p.ws not in gone),
+                        room.game._step,
+                    )
+                    await self.send_clients(room.viewers, state, delta, room)
+
+                    for player in [p for p in connected if p.ws in gone]:
+                        logger.error(
+                            "Player <%s> disconnected, could not send state",
+                            player.name,
+                        )
+                        connected.remove(player)
+
+            game_over = {"highscores": self.save_highscores(room)}
+            self.broadcast([p.ws for p in connected], game_over)
+            await self.send_clients(room.viewers, game_over)
+
+        except websockets.exceptions.ConnectionClosed as ws_closed:
+            logger.error("Player disconnected: %s", ws_closed)
+        finally:
+            try:
+                await self.report(room, game_players)
             finally:
-                try:
-                    if self.grading:
-                        for player in game_players:
-                            game_record = {
-                                "player": player.name,
-                                "score": self.game.score,
-                            }
-                            requests.post(self.grading, json=game_record, timeout=2)
-                except RequestException as err:
-                    logger.error(err)
-                    logger.warning("Could not save score to server")
-
-                for ws, player in self.game_player.items():
-                    logger.info("Disconnecting <%s>", player)
-                    await ws.close()
-                self.game_player = {}
+                await self.release(room, game_players)
+
+    async def report(self, room, game_players):
+        """Save the replay and trace of the game in room and grade its players."""
+        if room.game is None:  # no map or game could be made
+            return
+        if self.replays:
+            self.save_replay(room)
+        if room.game.archive is not None:
+            room.game.archive.close()
+        if self.replays and room.game.profiler:
+            self.save_trace(room)
+
+        try:
+            if self.grading:
+                for player in game_players:
+                    game_record = {
+                        "player": player.name,
+                        "score": room.game.score,
+                    }
+                    await asyncio.to_thread(
+                        requests.post, self.grading, json=game_record, timeout=2
+                    )
+        except RequestException as err:
+            logger.error(err)
+            logger.warning("Could not save score to server")
+
+    async def release(self, room, game_players):
+        """Disconnect the players of room and hand it back to the lobby."""
+        try:
+            room.tick_times.clear()
+            room.lockstep = False
+            self.tick_rate.clear(room=room.id)
+            await asyncio.gather(
+                *(
+                    self.outboxes[player.ws].drain(DRAIN_TIMEOUT)
+                    for player in game_players
+                    if player.ws in self.outboxes
+                )
+            )
+            for player in game_players:
+                logger.info("Disconnecting <%s>", player.name)
+                self.send_seconds.clear(client=player.name)
+                self.frames_dropped.clear(client=player.name)
+                self.game_player.pop(player.ws, None)
+                self.player_room.pop(player.ws, None)
+                await player.ws.close()
+        finally:
+            room.players = []
+            self.free_rooms.put_nowait(room)
 
 
 if __name__ == "__main__":
@@ -225,23 +678,81 @@ if __name__ == "__main__":
         "--debug", help="Open Bitmap with map on gameover", action="store_true"
     )
     parser.add_argument("--players", help="Number of players", type=int, default=1)
+    parser.add_argument(
+        "--rooms", help="Number of games played concurrently", type=int, default=1
+    )
+    parser.add_argument(
+        "--replays",
+        help="Record games to this directory, replays if none is given",
+        nargs="?",
+        const="replays",
+        default=None,
+    )
+    parser.add_argument(
+        "--archive",
+        help="Also archive every frame to the replays directory (with --replays)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Trace the ticks of every game to the replays directory (with --replays)",
+        action="store_true",
+    )
+    parser.add_argument("--fps", help="Ticks per second", type=int, default=GAME_SPEED)
+    parser.add_argument(
+        "--catch-up",
+        help="What to do with ticks late after a slow one: drop or run them",
+        choices=POLICIES,
+        default=SKIP,
+    )
+    parser.add_argument(
+        "--lockstep",
+        help="Step as soon as every player sent its key, instead of on the clock",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--keyframe-interval",
+        help="Frames between keyframes for delta clients",
+        type=int,
+        default=KEYFRAME_INTERVAL,
+    )
     parser.add_argument(
         "--grading-server",
         help="url of grading server",
         default="http://tetriscores.av.it.pt/game",
     )
     args = parser.parse_args()
+    if (args.archive or args.profile) and args.replays is None:
+        parser.error("--archive and --profile record to the --replays directory")
 
     async def main():
         """Start server tasks."""
         g = GameServer(
-            0, TIMEOUT, args.seed, args.players, args.grading_server, args.debug
+            0,
+            TIMEOUT,
+            args.seed,
+            args.players,
+            args.grading_server,
+            args.debug,
+            args.keyframe_interval,
+            args.rooms,
+            args.replays,
+            args.archive,
+            args.profile,
+            args.fps,
+            args.catch_up,
+            args.lockstep,
         )
 
         game_loop_task = asyncio.ensure_future(g.mainloop())
 
         logger.info("Listenning @ %s:%s", args.bind, args.port)
-        websocket_server = websockets.serve(g.incomming_handler, args.bind, args.port)
+        websocket_server = websockets.serve(
+            g.incomming_handler,
+            args.bind,
+            args.port,
+            process_request=g.process_request,
+        )
 
         await asyncio.gather(websocket_server, game_loop_task)
 
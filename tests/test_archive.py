@@ -0,0 +1,73 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import copy
+import random
+
+import pytest
+from archive import Archive, ArchiveWriter
+from game import Game
+
+
+def _comparable(state):
+    return {
+        "centipedes": [
+            ([tuple(pos) for pos in c["body"]], c["direction"])
+            for c in state["centipedes"]
+        ],
+        "mushrooms": sorted((tuple(m["pos"]), m["health"]) for m in state["mushrooms"]),
+        "blasts": [tuple(blast) for blast in state["blasts"]],
+        "bug_blaster": (
+            tuple(state["bug_blaster"]["pos"]),
+            state["bug_blaster"]["alive"],
+        ),
+        "spider": tuple(state["spider"]["pos"]) if "spider" in state else None,
+        "flee": tuple(state["flee"]["pos"]) if "flee" in state else None,
+        "step": state["step"],
+        "score": state["score"],
+    }
+
+
+def test_archive_seeks_any_step(tmp_path):
+    """Every archived step rebuilds the state the game produced."""
+
+    path = tmp_path / "game.frames"
+    game = Game(timeout=600, seed=5)
+    game.archive = ArchiveWriter(path, game.map.size)
+    game.start(["tester"])
+    keys = random.Random(5)
+    states = []
+    while game.running:
+        state = game.step(keys.choice(["w", "a", "s", "d", "A", "A", ""]))
+        states.append(copy.deepcopy(state))
+    game.archive.close()
+
+    archive = Archive(path)
+    assert len(archive) == len(states)
+    assert archive.first_step == 1
+    for state in reversed(states):
+        assert _comparable(archive.state(state["step"])) == _comparable(state)
+
+    frames = archive.steps(10, 19)
+    assert frames["mushrooms"].shape == (10, *game.map.size)
+    assert frames["step"].tolist() == list(range(10, 20))
+    assert frames["score"][-1] == states[18]["score"]
+
+    for first, last in ((0, 5), (1, len(states) + 1), (-3, 2)):
+        with pytest.raises(IndexError):
+            archive.steps(first, last)
+
+
+def test_frames_are_flushed_as_they_go(tmp_path):
+    path = tmp_path / "game.frames"
+    game = Game(timeout=600, seed=6)
+    writer = ArchiveWriter(path, game.map.size, flush_every=3)
+    game.start(["tester"])
+
+    for _ in range(7):
+        writer.write(game.step("A"))
+    assert len(Archive(path)) == 6  # readable before the writer is closed
+    writer.close()
+    assert len(Archive(path)) == 7
@@ -0,0 +1,97 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+
+import numpy as np
+import pytest
+
+from consts import Direction
+from game import Game, Centipede
+from batch import BatchGame, ACTIONS, FIRE, FLEE_NONE
+
+
+def normalize(state):
+    state = dict(state)
+    state["mushrooms"] = sorted((m["pos"], m["health"]) for m in state["mushrooms"])
+    state["centipedes"] = sorted(
+        (tuple(c["body"]), c["direction"]) for c in state["centipedes"]
+    )
+    state["blasts"] = sorted(state["blasts"])
+    return state
+
+
+@pytest.mark.parametrize("actions", [[0, 1, 2, 3, 4, 5, 5, 5], [FIRE]])
+def test_batch_matches_game(actions):
+    """BatchGame follows Game tick by tick, centipede splits included."""
+
+    for seed in range(50):
+        random.seed(seed)
+        game = Game(timeout=3600)
+        game.start(["tester"])
+        row = random.randint(10, 20)
+        game._centipedes = [
+            Centipede(
+                "mother",
+                [(x, row) for x in range(random.randint(0, 15), 20)],
+                random.choice([Direction.EAST, Direction.WEST]),
+            )
+        ]
+
+        batch = BatchGame(1)
+        batch.load(0, game)
+
+        # past several mushroom spawns, taken from the queue of the loaded map
+        for _ in range(300):
+            action = random.choice(actions)
+            state = game.step(ACTIONS[action])
+            batch.step([action])
+            if state is None:
+                break
+            assert normalize(batch.state(0)) == normalize(state)
+
+
+def test_batch_runs_to_completion():
+    batch = BatchGame(64, timeout=200, seed=1)
+    batch.reset()
+    rng = np.random.default_rng(1)
+
+    while batch.running.any():
+        batch.step(rng.integers(0, len(ACTIONS), batch.n))
+
+    assert (batch.steps <= 200).all()
+    assert batch.state(0)["step"] == batch.steps[0]
+
+
+def test_mushrooms_spawn_on_free_cells():
+    batch = BatchGame(64, timeout=400, seed=2)
+    batch.reset()
+    rng = np.random.default_rng(2)
+    spawned = 0
+
+    while batch.running.any():
+        used, before = batch.used.copy(), batch.flee_state.copy()
+        batch.step(rng.integers(0, len(ACTIONS), batch.n))
+        for g in np.flatnonzero(
+            (before == FLEE_NONE) & (batch.flee_state != FLEE_NONE)
+        ):
+            assert not used[g, batch.flee_x[g], batch.flee_y[g]]
+            spawned += 1
+
+    assert spawned > 0
+
+
+def test_full_blast_slots_do_not_fire():
+    batch = BatchGame(1, seed=3)
+    batch.reset()
+    batch.blast_alive[0] = True
+    batch.blast_y[0] = np.arange(batch.blast_alive.shape[1]) + 5
+    ys = batch.blast_y[0].copy()
+    batch.last_key[0] = FIRE
+    batch.cooldown[0] = 0
+
+    batch._update_bug_blaster(np.ones(1, dtype=bool))
+    assert (batch.blast_y[0] == ys).all()
+    assert batch.blast_alive[0].all()
@@ -0,0 +1,60 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import random
+
+from codec import BINARY, JSON, get_codec
+from game import Game
+
+
+def test_binary_codec_matches_json():
+    """Binary frames decode to what JSON clients receive, and are smaller."""
+
+    random.seed(5)
+    game = Game(timeout=300)
+    game.start(["tester"])
+    binary, plain = get_codec(BINARY), get_codec(JSON)
+
+    info = game.info()
+    assert binary.decode(binary.encode(info)) == json.loads(plain.encode(info))
+
+    while game.running:
+        state = game.step(random.choice("wasdAAAA"))
+        state["ts"] = "2024-01-01T00:00:00"
+        data = binary.encode(state)
+
+        assert binary.decode(data) == plain.decode(plain.encode(state))
+        assert len(data) < len(plain.encode(state)) / 2
+
+
+def test_other_messages_fall_back_to_json():
+    binary = get_codec(BINARY)
+    message = {"highscores": [["tester", 10]]}
+    assert binary.decode(binary.encode(message)) == message
+
+
+def test_attach_matches_full_encoding():
+    random.seed(6)
+    game = Game(timeout=50)
+    game.start(["tester"])
+    state = game.step("A")
+    fields = {"ts": "2024-01-01T00:00:00"}
+
+    for name in (JSON, BINARY):
+        codec = get_codec(name)
+        attached = codec.decode(codec.attach(codec.encode(state), fields))
+        assert attached == codec.decode(codec.encode({**state, **fields}))
+
+
+def test_attach_splices_json_payloads():
+    binary = get_codec(BINARY)
+    fields = {"ts": "2024-01-01T00:00:00"}
+
+    for message in ({"highscores": [["tester", 10]]}, {}):
+        data = binary.encode(message)
+        attached = binary.attach(data, fields)
+        assert attached.startswith(data[:-1])
+        assert binary.decode(attached) == {**message, **fields}
@@ -0,0 +1,44 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import random
+
+from delta import DeltaDecoder, DeltaEncoder
+from game import Game
+
+
+def roundtrip(message):
+    return json.loads(json.dumps(message))
+
+
+def test_delta_stream_rebuilds_states():
+    """Decoding the delta stream yields what a JSON client would have seen."""
+
+    random.seed(3)
+    game = Game(timeout=600)
+    game.start(["tester"])
+    encoder = DeltaEncoder(keyframe_interval=50)
+    decoder = DeltaDecoder()
+
+    full_size = delta_size = 0
+    while game.running:
+        state = game.step(random.choice("wasdAAAA"))
+        message = json.dumps(encoder.encode(state))
+        full_size += len(json.dumps(state))
+        delta_size += len(message)
+
+        expected = roundtrip(state)
+        decoded = decoder.decode(json.loads(message))
+        for s in (expected, decoded):
+            s["mushrooms"].sort(key=lambda m: m["pos"])
+        assert decoded == expected
+
+    assert delta_size < full_size / 3
+
+
+def test_non_state_messages_pass_through():
+    decoder = DeltaDecoder()
+    assert decoder.decode({"highscores": []}) == {"highscores": []}
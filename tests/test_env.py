@@ -0,0 +1,75 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from env import (
+    BLASTS,
+    BODIES,
+    BUG_BLASTER,
+    CHANNELS,
+    FIRE,
+    FLEE,
+    HEADS,
+    MUSHROOMS,
+    SPIDER,
+    CentipedeEnv,
+)
+
+
+def planes_from_state(state, size):
+    """The observation, the slow way."""
+    planes = np.zeros((CHANNELS, *size), dtype=np.uint8)
+    for mushroom in state["mushrooms"]:
+        planes[(MUSHROOMS, *mushroom["pos"])] = mushroom["health"]
+    for k, centipede in enumerate(state["centipedes"], 1):
+        for pos in centipede["body"]:
+            planes[(BODIES, *pos)] = k
+        planes[(HEADS, *centipede["body"][-1])] = k
+    for x, y in state["blasts"]:
+        planes[BLASTS, x, y] = 1
+    for channel, key in ((SPIDER, "spider"), (FLEE, "flee")):
+        if key in state:
+            planes[(channel, *state[key]["pos"])] = 1
+    if state["bug_blaster"]["alive"]:
+        planes[(BUG_BLASTER, *state["bug_blaster"]["pos"])] = 1
+    return planes
+
+
+def test_observation_matches_state():
+    env = CentipedeEnv()
+    obs, info = env.reset(seed=5)
+    assert obs.shape == (CHANNELS, *env.size) and obs.dtype == np.uint8
+    assert info["step"] == 0
+
+    while True:
+        obs, reward, terminated, truncated, info = env.step(FIRE)
+        assert np.array_equal(obs, planes_from_state(env.game._state, env.size))
+        if terminated or truncated:
+            break
+    assert terminated and not truncated
+
+
+def test_repeat_and_timeout():
+    env = CentipedeEnv(repeat=4, timeout=10)
+    env.reset(seed=1)
+    _, _, _, truncated, info = env.step(0)
+    assert info["step"] == 4 and not truncated
+
+    obs, _, _, _, _ = env.step(0)
+    obs, _, terminated, truncated, info = env.step(0)
+    assert info["step"] == 10
+    assert truncated and not terminated
+    assert obs is env.observation
+
+
+def test_reset_redraws_mushrooms():
+    env = CentipedeEnv()
+    env.reset(seed=1)
+    obs, _ = env.reset(seed=2)
+    expected = np.zeros(env.size, dtype=np.uint8)
+    for mushroom in env.game._mushrooms:
+        expected[mushroom.pos] = mushroom.health
+    assert np.array_equal(obs[MUSHROOMS], expected)
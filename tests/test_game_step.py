@@ -0,0 +1,78 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+import time
+
+from game import Game, MushroomField, Occupancy
+
+
+def test_step_runs_until_timeout_without_pacing():
+    """A full game can be fast-forwarded with step()."""
+
+    random.seed(1)
+    game = Game(timeout=300)
+    game.start(["tester"])
+
+    start = time.monotonic()
+    steps = 0
+    while game.running:
+        state = game.step("")
+        steps += 1
+
+    assert state["step"] == steps
+    assert steps <= 300
+    assert time.monotonic() - start < 5
+
+
+def test_step_returns_none_when_not_running():
+    game = Game(timeout=10)
+    assert game.step() is None
+
+
+def test_step_applies_key():
+    game = Game(timeout=100)
+    game.start(["tester"])
+    game._mushrooms = MushroomField()
+
+    x, y = game.bug_blaster.pos
+    state = game.step("a")
+
+    assert state["bug_blaster"]["pos"] == (x - 1, y)
+
+
+def test_seeded_games_do_not_interfere():
+    """Games with the same seed play the same, even when interleaved."""
+
+    first, second = Game(timeout=300, seed=7), Game(timeout=300, seed=7)
+    other = Game(timeout=300, seed=8)
+    for game in (first, second, other):
+        game.start(["tester"])
+
+    assert first.map.map == second.map.map
+    assert first.map.map != other.map.map
+
+    keys = "wasdA" * 60
+    for key in keys:
+        other.step(key)
+        random.random()
+        state = first.step(key)
+        assert second.step(key) == state
+
+
+def test_occupancy_follows_moves_and_hits():
+    """The occupancy grid kept across ticks matches one built from scratch."""
+
+    game = Game(timeout=600, seed=3)
+    game.start(["tester"])
+    hits = 0
+    while game.running:
+        kills = game.kills["centipede"]
+        game.step("A" if game._step % 3 else "ad"[game._step // 40 % 2])
+        hits += game.kills["centipede"] - kills
+        fresh = Occupancy(game.map.size)
+        fresh.rebuild(game.centipedes)
+        assert game._occupancy._count == fresh._count
+    assert hits > 0
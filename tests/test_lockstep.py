@@ -0,0 +1,88 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+import pytest
+import server
+from game import Game
+from server import GameServer, Room
+
+
+@pytest.mark.asyncio
+async def test_turn_ends_once_every_player_answered():
+    room = Room(1)
+    room.open_turn(["alice", "bob"], 3)
+    assert not room.turn.is_set()
+
+    assert room.answered("alice", "a")
+    assert room.answered("alice", "d", 3)  # the last key of a turn counts
+    assert not room.turn.is_set()
+    assert not room.answered("carol", "w")  # not playing
+    room.answered("bob", "s")
+    await asyncio.wait_for(room.turn.wait(), 1)
+    assert room.turn_keys() == {"alice": "d", "bob": "s"}
+
+    room.open_turn(["alice"], 4)
+    assert not room.turn.is_set()
+
+
+def test_turn_without_players_is_over():
+    room = Room(1)
+    room.open_turn([])
+    assert room.turn.is_set()
+
+
+def test_late_answers_are_dropped():
+    room = Room(1)
+    room.open_turn(["alice", "bob"], 5)
+    room.answered("alice", "a", 5)
+    room.open_turn(["alice", "bob"], 6)  # bob missed turn 5
+
+    assert not room.answered("bob", "w", 5)
+    assert room.turn_keys() == {"alice": "", "bob": ""}
+    assert room.answered("bob", "s", 6)
+    assert room.turn_keys() == {"alice": "", "bob": "s"}
+
+
+def lockstep_server(players):
+    game_server = GameServer(0, 100, seed=1)
+    room = game_server.rooms[1]
+    room.lockstep = True
+    room.game = Game(timeout=100, seed=1)
+    room.game.start(players)
+    for player in players:
+        game_server.game_player[f"ws-{player}"] = player
+    return game_server, room
+
+
+@pytest.mark.asyncio
+async def test_silent_player_plays_a_noop(monkeypatch):
+    monkeypatch.setattr(server, "LOCKSTEP_TIMEOUT", 0.01)
+    game_server, room = lockstep_server(["alice"])
+
+    room.game.keypress("alice", "a")
+    room.game.step()
+    x, y = room.game.bug_blaster.pos
+
+    room.open_turn(["ws-alice"], room.game._step)
+    assert await game_server.ticks_due(room, None) == 1
+    room.game.step()
+    assert room.game.bug_blaster.pos == (x, y)
+    game_server.maps.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_timeout_keeps_the_keys_sent(monkeypatch):
+    monkeypatch.setattr(server, "LOCKSTEP_TIMEOUT", 0.01)
+    game_server, room = lockstep_server(["alice", "bob"])
+    x, y = room.game.bug_blaster.pos
+
+    room.open_turn(["ws-alice", "ws-bob"], room.game._step)
+    room.answered("ws-alice", "a")
+    assert await game_server.ticks_due(room, None) == 1
+    room.game.step()
+    assert room.game.bug_blaster.pos == (x - 1, y)
+    game_server.maps.shutdown()
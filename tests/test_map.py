@@ -0,0 +1,110 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pickle
+import random
+
+import pytest
+
+from consts import Direction, Tiles
+from mapa import FreeCells, Map
+
+
+def test_grid_is_a_view_of_the_tiles():
+    mapa = Map(size=(12, 8), rng=random.Random(1))
+
+    assert mapa.grid.shape == (12, 8)
+    assert mapa.grid.tolist() == mapa.map
+    food = set(map(tuple, mapa.cells(Tiles.FOOD).tolist()))
+    assert {(x, y) for x, y, _ in mapa.mushrooms} <= food
+
+    with pytest.raises(ValueError):
+        mapa.grid[3, 2] = Tiles.STONE
+    tiles = mapa.map
+    assert mapa.map is tiles  # built once
+    mapa.set_tile((3, 2), Tiles.STONE)
+    assert mapa.grid[3, 2] == Tiles.STONE
+    assert mapa.map[3][2] == Tiles.STONE
+    assert tiles[3][2] != Tiles.STONE
+
+
+def test_set_tile_leaves_snapshots_and_copies_alone():
+    mapa = Map(size=(12, 8), rng=random.Random(3))
+    tile = mapa.get_tile((3, 2))
+    snapshot = mapa.snapshot()
+    copy = mapa.copy()
+
+    mapa.set_tile((3, 2), Tiles.STONE)
+    assert copy.get_tile((3, 2)) == tile
+    assert copy.map[3][2] == tile
+    mapa.restore(snapshot)
+    assert mapa.get_tile((3, 2)) == tile
+    assert mapa.map[3][2] == tile
+
+
+def test_edges_block_without_bounds_checks():
+    mapa = Map(size=(5, 8), mushroom_percentage=0)
+
+    assert mapa.calc_pos((0, 0), Direction.WEST) == (0, 0)
+    assert mapa.calc_pos((0, 0), Direction.NORTH) == (0, 0)
+    assert mapa.calc_pos((4, 7), Direction.EAST) == (4, 7)
+    assert mapa.calc_pos((4, 7), Direction.SOUTH) == (4, 7)
+    assert mapa.calc_pos((4, 7), Direction.EAST, traverse=True) == (0, 7)
+    assert mapa.calc_pos((1, 1), Direction.SOUTH) == (1, 2)
+
+
+def test_off_map_positions_are_blocked():
+    mapa = Map(size=(40, 24), mushroom_percentage=0)
+
+    for pos in ((-3, 5), (5, 26), (42, 3), (-1, 0), (40, 23)):
+        assert mapa.is_blocked(pos, False)
+    mapa.set_tile((1, 5), Tiles.STONE)
+    assert not mapa.is_blocked((-3, 5), True)
+    assert mapa.is_blocked((1, 5), False)
+    assert not mapa.is_blocked((41, 5), True)  # wraps to the stone, traversed
+    with pytest.raises(IndexError):
+        mapa.get_tile((5, 26))
+
+
+def test_pickle_keeps_tiles():
+    mapa = Map(size=(6, 9), rng=random.Random(2))
+
+    copy = pickle.loads(pickle.dumps(mapa))
+    assert copy.map == mapa.map
+    assert copy.size == (6, 9)
+
+
+def test_moves_follow_stones():
+    mapa = Map(size=(6, 8), mushroom_percentage=0)
+
+    mapa.set_tile((2, 2), Tiles.STONE)
+    assert mapa.calc_pos((1, 2), Direction.EAST) == (1, 2)
+    assert mapa.calc_pos((2, 1), Direction.SOUTH) == (2, 1)
+    assert mapa.calc_pos((1, 2), Direction.EAST, traverse=True) == (2, 2)
+
+    moves = mapa.transitions()
+    assert moves.shape == (6, 8, 4, 2)
+    assert moves[3, 2, Direction.WEST].tolist() == [3, 2]
+
+    mapa.set_tile((2, 2), Tiles.PASSAGE)
+    assert mapa.calc_pos((1, 2), Direction.EAST) == (2, 2)
+
+
+def test_full_map_stops_spawning():
+    mapa = Map(size=(6, 8), mushroom_percentage=1, rng=random.Random(3))
+
+    assert len(mapa.cells(Tiles.PASSAGE)) == 6 * 5  # only the bottom rows
+    spawned = [mapa.spawn_mushroom() for _ in range(40)]
+    assert None in spawned
+    assert all(y <= 8 - 5 for x, y in filter(None, spawned))
+
+
+def test_free_cells():
+    free = FreeCells([(0, 0), (1, 0), (2, 5)], rows=range(3))
+
+    assert len(free) == 2 and (2, 5) not in free
+    free.discard((0, 0))
+    free.add((3, 1))
+    assert {free.sample(random.Random(seed)) for seed in range(50)} == {(1, 0), (3, 1)}
@@ -0,0 +1,78 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+import pytest
+from consts import Tiles
+from game import Game
+from mappool import MapPool
+
+
+def _play(game, steps=300):
+    game.start(["tester"])
+    return [game.step("wasdA"[i % 5]) for i in range(steps) if game.running]
+
+
+def test_pooled_maps_play_like_fresh_ones():
+    maps = MapPool(capacity=2)
+    maps.prefetch(9, (40, 24))
+
+    fresh = _play(Game(timeout=600, seed=9))
+    assert _play(Game(timeout=600, seed=9, maps=maps)) == fresh
+    # a second copy is not affected by the mushrooms the first one spawned
+    assert _play(Game(timeout=600, seed=9, maps=maps)) == fresh
+
+    for seed in range(5):
+        maps.get(seed, (20, 20))
+    assert len(maps) == 2
+    maps.shutdown()
+
+
+def test_copies_are_independent():
+    maps = MapPool()
+    first, second = maps.get(1, (30, 20)), maps.get(1, (30, 20))
+
+    spawned = [first.spawn_mushroom() for _ in range(200)]
+    assert first.map != second.map
+    assert [second.spawn_mushroom() for _ in range(200)] == spawned
+    assert first.map == second.map
+    maps.shutdown()
+
+
+def test_changing_a_copy_leaves_the_pool_alone():
+    maps = MapPool()
+    first, second = maps.get(2, (30, 20)), maps.get(2, (30, 20))
+    tiles = second.grid.tolist()
+
+    with pytest.raises(ValueError):
+        first.grid[4, 3] = Tiles.STONE
+    first.set_tile((4, 3), Tiles.STONE)
+    first.set_tile((5, 3), Tiles.FOOD)
+
+    assert second.grid.tolist() == second.map == tiles
+    assert second.grid[4, 3] != Tiles.STONE
+    assert maps.get(2, (30, 20)).map == tiles
+    maps.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_wait_does_not_block_the_event_loop():
+    maps = MapPool()
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    ticker = asyncio.ensure_future(tick())
+    await maps.wait(4, (200, 120))
+    ticker.cancel()
+
+    assert ticks > 1
+    assert maps.get(4, (200, 120)).map == Game(seed=4, size=(200, 120)).map.map
+    maps.shutdown()
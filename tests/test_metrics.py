@@ -0,0 +1,42 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    ticks = Counter(registry, "ticks_total", "Ticks played")
+    queued = Gauge(registry, "queued", "Queued players", lambda: 3)
+    latency = Histogram(registry, "send_seconds", "Send time", (0.01, 0.1))
+
+    ticks.inc(room=1)
+    ticks.inc(2, room=1)
+    ticks.inc(room=2)
+    queued.set(5, room='a"b')
+    latency.observe(0.005, client="bot")
+    latency.observe(0.05, client="bot")
+    latency.observe(3, client="bot")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE ticks_total counter" in lines
+    assert 'ticks_total{room="1"} 3' in lines
+    assert 'ticks_total{room="2"} 1' in lines
+    assert "queued 3" in lines
+    assert 'queued{room="a\\"b"} 5' in lines
+    assert 'send_seconds_bucket{client="bot",le="0.01"} 1' in lines
+    assert 'send_seconds_bucket{client="bot",le="0.1"} 2' in lines
+    assert 'send_seconds_bucket{client="bot",le="+Inf"} 3' in lines
+    assert 'send_seconds_count{client="bot"} 3' in lines
+
+
+def test_clear_drops_label_set():
+    registry = Registry()
+    rate = Gauge(registry, "tick_rate", "Ticks per second")
+    rate.set(9.5, room=1)
+    rate.set(10, room=2)
+    rate.clear(room=1)
+
+    assert list(rate.samples()) == [("tick_rate", (("room", 2),), 10)]
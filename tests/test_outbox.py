@@ -0,0 +1,64 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+import pytest
+from outbox import Outbox
+
+
+class SlowClient:
+    def __init__(self):
+        self.received = []
+        self.gate = asyncio.Event()
+        self.fail = False
+
+    async def send(self, payload):
+        await self.gate.wait()
+        self.received.append(payload)
+        return not self.fail
+
+
+@pytest.mark.asyncio
+async def test_newer_frame_replaces_unsent_one():
+    client = SlowClient()
+    outbox = Outbox(client.send)
+
+    outbox.post("info", frame=False)
+    await asyncio.sleep(0)  # the writer is now stuck sending "info"
+    assert not outbox.post("frame 1")
+    assert outbox.post("frame 2")
+    assert outbox.post("frame 3")
+    outbox.post("game over", frame=False)
+    assert not outbox.post("frame 4")  # not next to a frame any more
+    assert len(outbox) == 3
+    assert outbox.dropped == 2
+
+    client.gate.set()
+    assert await outbox.drain(1)
+    assert client.received == ["info", "frame 3", "game over", "frame 4"]
+    outbox.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_send_closes_outbox():
+    client = SlowClient()
+    client.fail = True
+    client.gate.set()
+    outbox = Outbox(client.send)
+
+    outbox.post("frame 1")
+    assert await outbox.drain(1)
+    assert outbox.closed
+    assert not outbox.post("frame 2")
+    assert client.received == ["frame 1"]
+
+
+@pytest.mark.asyncio
+async def test_drain_times_out_on_stuck_client():
+    outbox = Outbox(SlowClient().send)
+    outbox.post("frame 1")
+    assert not await outbox.drain(0.01)
+    outbox.close()
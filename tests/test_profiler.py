@@ -0,0 +1,32 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+from game import Game
+from profiler import TICK, TickProfiler
+
+
+def test_profiler_times_every_phase(tmp_path):
+    game = Game(timeout=200, seed=2)
+    game.profiler = TickProfiler(ticks=50, budget=0)
+    game.start(["tester"])
+    steps = 0
+    while game.running:
+        game.step("A")
+        steps += 1
+
+    histograms = game.profiler.histograms()
+    for phase in (TICK, "centipedes", "spider", "collision", "blasts", "state"):
+        assert sum(histograms[phase].values()) == steps
+    assert len(game.profiler.overruns) == steps  # no time fits a zero budget
+
+    path = tmp_path / "ticks.trace.json"
+    game.profiler.dump(path)
+    events = json.load(open(path))["traceEvents"]
+    ticks = [event for event in events if event["name"] == TICK]
+    assert len(ticks) == min(steps, 50)
+    assert ticks[-1]["args"]["tick"] == steps
+    assert sum(event["name"] == "collision" for event in events) == 2 * len(ticks)
@@ -0,0 +1,34 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+
+import replay
+from game import Game
+
+
+def test_replay_reproduces_game(tmp_path):
+    """Keys pressed between frames are replayed onto the same frames."""
+
+    game = Game(timeout=3600, seed=11)
+    game.start(["tester"])
+    keys = random.Random(11)
+    while game.running:
+        for _ in range(keys.choice([0, 0, 1, 2])):
+            game.keypress("tester", keys.choice(["w", "a", "s", "d", "A", "", "B"]))
+        game.step()
+
+    path = tmp_path / "game.replay"
+    replay.save(path, game)
+    assert os.path.getsize(path) < 4096
+
+    header, inputs = replay.load(path)
+    assert header["score"] == game.score
+    assert len(inputs) == game._step
+
+    replayed = replay.simulate(header, inputs)
+    assert replayed.score == game.score
+    assert replayed._step == game._step
+    assert replay.verify(path)
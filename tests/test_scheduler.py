@@ -0,0 +1,59 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+
+import pytest
+from scheduler import BURST, SKIP, TickScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "policy, max_burst, due, skipped",
+    [(SKIP, 5, 1, 2), (BURST, 5, 3, 0), (BURST, 2, 2, 1)],
+)
+async def test_late_ticks_follow_policy(policy, max_burst, due, skipped):
+    clock = FakeClock()
+    scheduler = TickScheduler(1000, policy, max_burst, clock=clock)
+
+    assert await scheduler.wait() == 1  # due at 1 ms
+    assert scheduler.overruns == 0
+
+    clock.now = 0.0045  # the ticks due at 2, 3 and 4 ms are late
+    assert await scheduler.wait() == due
+    assert scheduler.overruns == 1
+    assert scheduler.skipped == skipped
+    assert scheduler.ticks == 1 + due
+
+    clock.now = 0.0046  # back on time for the tick due at 5 ms
+    assert await scheduler.wait() == 1
+    assert scheduler.overruns == 1
+
+
+@pytest.mark.asyncio
+async def test_compute_time_does_not_drift():
+    scheduler = TickScheduler(100)
+    start = time.monotonic()
+    for _ in range(20):
+        await scheduler.wait()
+        time.sleep(0.004)  # the tick work
+    elapsed = time.monotonic() - start
+
+    # sleeping a full period after every tick would take 20 * 14 ms
+    assert elapsed < 0.25
+    assert scheduler.ticks == 20
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        TickScheduler(10, "rewind")
@@ -0,0 +1,51 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from server import GameServer, Player
+
+
+class FakeSocket:
+    closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_room_comes_back_when_the_game_cannot_start():
+    game_server = GameServer(0, 100, grading="http://localhost:1/game")
+    room = game_server.free_rooms.get_nowait()
+    player = Player("alice", FakeSocket())
+
+    async def broken(*args):
+        raise RuntimeError("no map")
+
+    game_server.maps.wait = broken
+    with pytest.raises(RuntimeError):
+        await game_server.play(room, [player])
+
+    assert game_server.free_rooms.get_nowait() is room
+    assert player.ws.closed
+    assert room.game is None and room.players == []
+    game_server.maps.shutdown()
+
+
+def test_catch_up_bursts_do_not_spike_the_tick_rate():
+    game_server = GameServer(0, 100)
+    room = game_server.rooms[1]
+
+    def rate():
+        [(_, _, value)] = game_server.tick_rate.samples()
+        return value
+
+    for tick in range(30):
+        game_server.record_tick(room, 100 + tick * 0.1)
+    assert rate() == pytest.approx(10)
+
+    for _ in range(5):  # late ticks run back to back
+        game_server.record_tick(room, 103.5)
+    assert rate() < 13
+    game_server.maps.shutdown()
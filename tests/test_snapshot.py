@@ -0,0 +1,48 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import copy
+import random
+
+from game import Game
+
+
+def _play(game, keys):
+    return [copy.deepcopy(game.step(key)) for key in keys if game.running]
+
+
+def test_restore_replays_the_same_frames():
+    """Every rollout from a snapshot sees the frames of the first one."""
+
+    game = Game(timeout=3000, seed=21)
+    game.start(["tester"])
+    keys = random.Random(21)
+    _play(game, [keys.choice("wasdA") for _ in range(100)])
+
+    snapshot = game.snapshot()
+    rollout = [keys.choice(["w", "a", "s", "d", "A", "A", ""]) for _ in range(400)]
+    first = _play(game, rollout)
+    inputs, score = game.inputs, game.score
+
+    for _ in range(2):
+        game.restore(snapshot)
+        assert game._step == 100
+        assert _play(game, rollout) == first
+        assert game.inputs == inputs
+        assert game.score == score
+
+
+def test_map_restore_undoes_mushroom_queue_refill():
+    game = Game(seed=4)
+    snapshot = game.map.snapshot()
+    tiles = game.map.map
+
+    spawned = [game.map.spawn_mushroom() for _ in range(250)]
+    assert game.map.map != tiles  # refilled
+    assert snapshot[0] is not game.map._tiles  # on a copy of the tiles
+
+    game.map.restore(snapshot)
+    assert game.map.map == tiles
+    assert [game.map.spawn_mushroom() for _ in range(250)] == spawned
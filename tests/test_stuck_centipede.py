@@ -5,7 +5,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import pytest
 from consts import Direction
-from game import Game, Mushroom, Centipede
+from game import Game, Mushroom, MushroomField, Centipede
 
 
 @pytest.mark.asyncio
@@ -15,7 +15,7 @@ async def test_centipede_moves_down_after_trap():
     game = Game(timeout=300)
     game.start(["tester"])
 
-    game._mushrooms = []
+    game._mushrooms = MushroomField()
     game._centipedes = []
 
     cx = game.map.size[0] // 2
@@ -29,12 +29,14 @@ async def test_centipede_moves_down_after_trap():
     centipede = Centipede("debug_down", centipede_body, Direction.EAST)
     game._centipedes.append(centipede)
 
-    game._mushrooms = [
-        Mushroom(cx + 6, cy),
-        Mushroom(cx + 5, cy + 1),
-        Mushroom(cx - 9, cy),
-        Mushroom(cx - 8, cy + 1),
-    ]
+    game._mushrooms = MushroomField(
+        [
+            Mushroom(cx + 6, cy),
+            Mushroom(cx + 5, cy + 1),
+            Mushroom(cx - 9, cy),
+            Mushroom(cx - 8, cy + 1),
+        ]
+    )
 
     initial_y = centipede.head[1]
 
@@ -55,7 +57,7 @@ async def test_centipede_moves_up_after_trap():
     game = Game(timeout=300)
     game.start(["tester"])
 
-    game._mushrooms = []
+    game._mushrooms = MushroomField()
     game._centipedes = []
 
     cx = game.map.size[0] // 2
@@ -70,12 +72,14 @@ async def test_centipede_moves_up_after_trap():
     centipede.move_dir = -1  # moving up
     game._centipedes.append(centipede)
 
-    game._mushrooms = [
-        Mushroom(cx + 6, cy),
-        Mushroom(cx + 5, cy - 1),
-        Mushroom(cx - 9, cy),
-        Mushroom(cx - 8, cy - 1),
-    ]
+    game._mushrooms = MushroomField(
+        [
+            Mushroom(cx + 6, cy),
+            Mushroom(cx + 5, cy - 1),
+            Mushroom(cx - 9, cy),
+            Mushroom(cx - 8, cy - 1),
+        ]
+    )
 
     initial_y = centipede.head[1]
 
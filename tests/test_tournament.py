@@ -0,0 +1,67 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+from tournament import play, seed_range, tournament
+
+AGENT = """
+import itertools
+
+keys = itertools.cycle("aAdA")
+
+
+def act(state):
+    return next(keys)
+"""
+
+STATEFUL_AGENT = """
+frames = 0
+
+
+def start(info):
+    assert frames == 0, "state left over from another game"
+
+
+def act(state):
+    global frames
+    frames += 1
+    return "A"
+"""
+
+
+def test_play_is_reproducible(tmp_path):
+    agent = tmp_path / "agent.py"
+    agent.write_text(AGENT)
+
+    first = play(str(agent), seed=4, timeout=200)
+    second = play(str(agent), seed=4, timeout=200)
+
+    for record in (first, second):
+        del record["time"]
+    assert first == second
+    assert 0 < first["steps"] <= 200
+    assert set(first["kills"]) == {"centipede", "mushroom", "spider", "flee"}
+
+
+def test_tournament_streams_results(tmp_path):
+    agent = tmp_path / "agent.py"
+    agent.write_text(AGENT)
+    results = tmp_path / "results.jsonl"
+
+    records = tournament([str(agent)], seed_range("1-4"), results, timeout=100)
+
+    lines = [json.loads(line) for line in results.read_text().splitlines()]
+    assert sorted(r["seed"] for r in lines) == [1, 2, 3, 4]
+    assert len(records) == 4
+
+
+def test_agents_start_every_game_afresh(tmp_path, monkeypatch):
+    (tmp_path / "stateful_agent.py").write_text(STATEFUL_AGENT)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    first = play("stateful_agent", seed=2, timeout=50)
+    second = play("stateful_agent", seed=2, timeout=50)
+    assert first["score"] == second["score"]
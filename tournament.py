@@ -0,0 +1,123 @@
+"""Headless tournament runner.
+
+Plays every agent against a range of seeds on all cores, without the network
+server, and streams one JSON line per finished game to the results file.
+
+An agent is a module (name or path to a .py file) with a function
+act(state) returning the key to press, as a networked agent would send it.
+It may also define start(info), called with the game info before the first
+frame. Both receive the same JSON structures a networked agent would. The
+module is loaded afresh for every game, so state it keeps at module level
+does not leak from one game to the next, whatever worker plays them.
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from consts import TIMEOUT
+from game import Game
+
+logger = logging.getLogger("Tournament")
+logger.setLevel(logging.INFO)
+
+
+def load_agent(agent):
+    """New module of an agent given its module name or the path to its file.
+
+    Unlike an import, every call runs the module again.
+    """
+    if agent.endswith(".py"):
+        name = os.path.splitext(os.path.basename(agent))[0]
+        spec = importlib.util.spec_from_file_location(name, agent)
+    else:
+        spec = importlib.util.find_spec(agent)
+        if spec is None:
+            raise ModuleNotFoundError(f"No agent module named {agent}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _wire(message):
+    """message as seen by an agent after a trip through the server."""
+    return json.loads(json.dumps(message))
+
+
+def play(agent, seed, timeout=TIMEOUT):
+    """Play one game of agent with seed, returns its result record."""
+    module = load_agent(agent)
+    started = time.perf_counter()
+
+    game = Game(timeout=timeout, seed=seed)
+    game.start([agent])
+    if hasattr(module, "start"):
+        module.start(_wire(game.info()))
+
+    key = ""
+    while game.running:
+        state = game.step(key)
+        key = (module.act(_wire(state)) or "")[:1]
+
+    return {
+        "agent": agent,
+        "seed": seed,
+        "score": game.score,
+        "steps": game._step,
+        "kills": dict(game.kills),
+        "time": round(time.perf_counter() - started, 3),
+    }
+
+
+def tournament(agents, seeds, results, timeout=TIMEOUT, workers=None):
+    """Play every agent with every seed, appending records to results.
+
+    Returns the records in completion order.
+    """
+    records = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [
+            pool.submit(play, agent, seed, timeout)
+            for agent in agents
+            for seed in seeds
+        ]
+        with open(results, "a") as outfile:
+            for future in as_completed(futures):
+                record = future.result()
+                logger.info(
+                    "%s seed=%s score=%s",
+                    record["agent"],
+                    record["seed"],
+                    record["score"],
+                )
+                outfile.write(json.dumps(record) + "\n")
+                outfile.flush()
+                records.append(record)
+    return records
+
+
+def seed_range(text):
+    """Parse seeds given as N or FIRST-LAST (inclusive)."""
+    first, _, last = text.partition("-")
+    return range(int(first), int(last or first) + 1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    logging.getLogger("Game").setLevel(logging.WARNING)
+    logging.getLogger("Map").setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("agents", nargs="+", help="Agent modules or files")
+    parser.add_argument("--seeds", help="Seeds, N or FIRST-LAST", default="1-10")
+    parser.add_argument("--timeout", help="Frames per game", type=int, default=TIMEOUT)
+    parser.add_argument("--workers", help="Worker processes", type=int, default=None)
+    parser.add_argument("--results", help="Results file", default="results.jsonl")
+    args = parser.parse_args()
+
+    tournament(
+        args.agents, seed_range(args.seeds), args.results, args.timeout, args.workers
+    )
@@ -232,9 +232,9 @@ async def main(SCALE):
         pygame.display.flip()
 
 
-async def messages_handler(ws_path, queue):
+async def messages_handler(ws_path, queue, room=1):
     async with websockets.connect(ws_path) as websocket:
-        await websocket.send(json.dumps({"cmd": "join"}))
+        await websocket.send(json.dumps({"cmd": "join", "room": room}))
 
         while True:
             r = await websocket.recv()
@@ -251,6 +251,7 @@ if __name__ == "__main__":
         "--scale", help="reduce size of window by x times", type=int, default=1
     )
     parser.add_argument("--port", help="TCP port", type=int, default=PORT)
+    parser.add_argument("--room", help="Room to watch", type=int, default=1)
     args = parser.parse_args()
     SCALE = 32 * (1 / args.scale)
 
@@ -263,7 +264,9 @@ if __name__ == "__main__":
 
     try:
         LOOP.run_until_complete(
-            asyncio.gather(messages_handler(ws_path, q), main_loop(q, SCALE=SCALE))
+            asyncio.gather(
+                messages_handler(ws_path, q, args.room), main_loop(q, SCALE=SCALE)
+            )
         )
     finally:
         LOOP.stop()